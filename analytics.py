@@ -0,0 +1,162 @@
+import numpy as np
+
+# 列式加载时读取的列
+ANALYTICS_COLUMNS = ['id', 'symbol', 'close_ts', 'profit_loss']
+# 从SQLite按列读取时每批的行数
+LOAD_BATCH_SIZE = 50000
+
+
+class TradeColumns:
+    # 交易数据的列式表示：按平仓时间排序的NumPy数组，品种用整数编码
+    def __init__(self, ids, symbol_codes, symbols, close_ts, profit_loss):
+        self.ids = ids
+        self.symbol_codes = symbol_codes
+        self.symbols = symbols
+        self.close_ts = close_ts
+        self.profit_loss = profit_loss
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        # rows: (id, symbol, close_ts, profit_loss) 的可迭代对象
+        codes = {}
+        ids, symbol_codes, close_ts, profit_loss = [], [], [], []
+        for trade_id, symbol, ts, pl in rows:
+            ids.append(trade_id)
+            symbol_codes.append(codes.setdefault(symbol, len(codes)))
+            close_ts.append(-1 if ts is None else ts)
+            profit_loss.append(0.0 if pl is None else pl)
+        return cls._sorted(
+            np.asarray(ids, dtype=np.int64),
+            np.asarray(symbol_codes, dtype=np.int32),
+            list(codes),
+            np.asarray(close_ts, dtype=np.int64),
+            np.asarray(profit_loss, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_model(cls, data_model, batch_size=LOAD_BATCH_SIZE):
+        return cls.from_rows(data_model.iter_trades(batch_size=batch_size, columns=ANALYTICS_COLUMNS))
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        # 直接使用列式快照中的内存映射数组，无需经过Python元组
+        profit_loss = np.nan_to_num(np.asarray(snapshot.column('profit_loss')), nan=0.0)
+        return cls._sorted(
+            np.asarray(snapshot.column('id')),
+            np.asarray(snapshot.column('symbol'), dtype=np.int32),
+            list(snapshot.dictionaries['symbol']),
+            np.asarray(snapshot.column('close_ts')),
+            profit_loss,
+        )
+
+    @classmethod
+    def _sorted(cls, ids, symbol_codes, symbols, close_ts, profit_loss):
+        # 按平仓时间稳定排序；无法解析平仓时间的交易保持录入顺序排在最前
+        order = np.argsort(close_ts, kind='stable')
+        return cls(ids[order], symbol_codes[order], symbols, close_ts[order], profit_loss[order])
+
+    def for_symbol(self, symbol):
+        mask = self.symbol_codes == self.symbols.index(symbol)
+        return self.profit_loss[mask]
+
+
+def equity_curve(profit_loss):
+    return np.cumsum(profit_loss)
+
+
+def drawdown_curve(profit_loss):
+    # 每笔交易后距离历史最高权益的回撤（非负）
+    equity = equity_curve(profit_loss)
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0))
+    return peak - equity
+
+
+def max_drawdown(profit_loss):
+    if len(profit_loss) == 0:
+        return 0.0
+    return float(drawdown_curve(profit_loss).max())
+
+
+def streaks(profit_loss):
+    # 最长连胜、最长连亏（持平交易中断连续）
+    if len(profit_loss) == 0:
+        return 0, 0
+    signs = np.sign(profit_loss).astype(np.int8)
+    boundaries = np.flatnonzero(np.diff(signs)) + 1
+    starts = np.concatenate(([0], boundaries))
+    lengths = np.diff(np.concatenate((starts, [len(signs)])))
+    run_signs = signs[starts]
+    longest_win = int(lengths[run_signs > 0].max(initial=0))
+    longest_loss = int(lengths[run_signs < 0].max(initial=0))
+    return longest_win, longest_loss
+
+
+def summarize(profit_loss):
+    profit_loss = np.asarray(profit_loss, dtype=np.float64)
+    count = len(profit_loss)
+    wins = profit_loss[profit_loss > 0]
+    losses = profit_loss[profit_loss < 0]
+    gross_profit = float(wins.sum())
+    gross_loss = float(-losses.sum())
+    longest_win, longest_loss = streaks(profit_loss)
+    return {
+        'trades': count,
+        'total_profit_loss': float(profit_loss.sum()),
+        'winning_trades': len(wins),
+        'losing_trades': len(losses),
+        'win_rate': len(wins) / count if count else 0.0,
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'profit_factor': gross_profit / gross_loss if gross_loss else (float('inf') if gross_profit else 0.0),
+        'expectancy': float(profit_loss.mean()) if count else 0.0,
+        'average_win': float(wins.mean()) if len(wins) else 0.0,
+        'average_loss': float(losses.mean()) if len(losses) else 0.0,
+        'max_drawdown': max_drawdown(profit_loss),
+        'longest_win_streak': longest_win,
+        'longest_loss_streak': longest_loss,
+    }
+
+
+def summarize_by_symbol(columns):
+    # 用bincount一次性算出各品种的计数和求和，回撤和连胜按品种切片计算
+    codes = columns.symbol_codes
+    profit_loss = columns.profit_loss
+    n_symbols = len(columns.symbols)
+    counts = np.bincount(codes, minlength=n_symbols)
+    totals = np.bincount(codes, weights=profit_loss, minlength=n_symbols)
+    wins = np.bincount(codes, weights=profit_loss > 0, minlength=n_symbols)
+    losses = np.bincount(codes, weights=profit_loss < 0, minlength=n_symbols)
+    gross_profit = np.bincount(codes, weights=np.where(profit_loss > 0, profit_loss, 0.0), minlength=n_symbols)
+    gross_loss = np.bincount(codes, weights=np.where(profit_loss < 0, -profit_loss, 0.0), minlength=n_symbols)
+
+    # 按品种稳定排序后，每个品种的交易是连续且保持时间顺序的一段
+    order = np.argsort(codes, kind='stable')
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    grouped = profit_loss[order]
+
+    result = {}
+    for code, symbol in enumerate(columns.symbols):
+        count = int(counts[code])
+        symbol_pl = grouped[offsets[code]:offsets[code + 1]]
+        longest_win, longest_loss = streaks(symbol_pl)
+        result[symbol] = {
+            'trades': count,
+            'total_profit_loss': float(totals[code]),
+            'winning_trades': int(wins[code]),
+            'losing_trades': int(losses[code]),
+            'win_rate': float(wins[code] / count) if count else 0.0,
+            'gross_profit': float(gross_profit[code]),
+            'gross_loss': float(gross_loss[code]),
+            'profit_factor': (float(gross_profit[code] / gross_loss[code]) if gross_loss[code]
+                              else (float('inf') if gross_profit[code] else 0.0)),
+            'expectancy': float(totals[code] / count) if count else 0.0,
+            'average_win': float(gross_profit[code] / wins[code]) if wins[code] else 0.0,
+            'average_loss': float(-gross_loss[code] / losses[code]) if losses[code] else 0.0,
+            'max_drawdown': max_drawdown(symbol_pl),
+            'longest_win_streak': longest_win,
+            'longest_loss_streak': longest_loss,
+        }
+    return result
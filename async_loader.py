@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+# 后台加载线程数
+LOADER_WORKERS = 2
+# 每帧向界面添加的条目数
+APPLY_BATCH_SIZE = 20
+
+
+class AsyncLoader:
+    # 在线程池中执行查询，结果回到UI线程应用；按owner（通常是界面名）取消过期的加载
+    def __init__(self, max_workers=LOADER_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='loader')
+        self._generations = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _generation(self, owner):
+        with self._lock:
+            return self._generations.get(owner, 0)
+
+    def is_current(self, owner, generation):
+        return self._generation(owner) == generation
+
+    def load(self, owner, func, on_result, on_error=None):
+        generation = self._generation(owner)
+        future = self._executor.submit(func)
+        with self._lock:
+            self._futures.setdefault(owner, set()).add(future)
+
+        def done(finished):
+            with self._lock:
+                self._futures.get(owner, set()).discard(finished)
+            if finished.cancelled():
+                return
+            Clock.schedule_once(lambda dt: self._deliver(owner, generation, finished, on_result, on_error))
+
+        future.add_done_callback(done)
+        return future
+
+    def _deliver(self, owner, generation, future, on_result, on_error):
+        # 用户已经离开界面或重新进入时丢弃旧结果
+        if not self.is_current(owner, generation):
+            return
+        error = future.exception()
+        if error is None:
+            on_result(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            Logger.error(f'AsyncLoader: {owner} 加载失败: {error!r}')
+
+    def cancel(self, owner):
+        with self._lock:
+            self._generations[owner] = self._generations.get(owner, 0) + 1
+            pending = self._futures.pop(owner, set())
+        for future in pending:
+            future.cancel()
+
+    def apply_in_batches(self, owner, items, apply, batch_size=APPLY_BATCH_SIZE, on_done=None):
+        # 把大量控件的创建分摊到多帧，避免单帧卡顿
+        generation = self._generation(owner)
+        items = list(items)
+
+        def step(start):
+            if not self.is_current(owner, generation):
+                return
+            for item in items[start:start + batch_size]:
+                apply(item)
+            if start + batch_size < len(items):
+                Clock.schedule_once(lambda dt: step(start + batch_size))
+            elif on_done is not None:
+                on_done()
+
+        step(0)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_loader = None
+
+
+def get_loader():
+    global _loader
+    if _loader is None:
+        _loader = AsyncLoader()
+    return _loader
@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from data_model import DataModel, LIST_COLUMNS
+from db_connection import get_manager
+from trade_import import import_csv
+from benchmarks.synthetic import SCALES, generate_trades, write_csv
+
+# 读操作重复次数，取中位数
+READ_REPEAT = 5
+# 单条插入基准最多插入的笔数（逐条提交很慢）
+SINGLE_INSERT_LIMIT = 1000
+# 批量插入时每次预先生成的笔数（生成耗时不计入插入时间）
+GENERATE_CHUNK = 100000
+PAGE_LIMIT = 200
+RESULTS_DIR = 'bench_results'
+
+
+def timed(func, repeat=1):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    return result, durations
+
+
+def record(results, name, durations, rows):
+    median = statistics.median(durations)
+    results[name] = {
+        'seconds': median,
+        'min_seconds': min(durations),
+        'runs': len(durations),
+        'rows': rows,
+        'rows_per_second': rows / median if median > 0 and rows else None,
+    }
+    print(f"  {name:<28} {median * 1000:10.2f} ms  ({rows} 行)")
+
+
+def fresh_model(db_path):
+    # 关闭共享连接后重新打开，测量不含查询缓存的冷读
+    get_manager(db_path).close()
+    return DataModel(db_path)
+
+
+def walk_pages(model):
+    after_id = 0
+    count = 0
+    while True:
+        rows = model.get_trades_page(after_id, PAGE_LIMIT, columns=LIST_COLUMNS)
+        if not rows:
+            return count
+        count += len(rows)
+        after_id = rows[-1][0]
+
+
+def run_scale(scale_name, count, work_dir):
+    print(f"规模 {scale_name}（{count} 笔）")
+    results = {}
+    db_path = os.path.join(work_dir, f'bench_{scale_name}.db')
+
+    # 单条插入：每条一个事务
+    model = DataModel(os.path.join(work_dir, f'single_{scale_name}.db'))
+    single = list(generate_trades(min(count, SINGLE_INSERT_LIMIT), seed=1))
+    _, durations = timed(lambda: [model.insert_trade(trade) for trade in single])
+    record(results, 'insert_trade', durations, len(single))
+
+    # 批量插入：分块预先生成，只计插入耗时
+    model = DataModel(db_path)
+    trades = generate_trades(count)
+    inserted = 0
+    elapsed = 0.0
+    while inserted < count:
+        chunk = [next(trades) for _ in range(min(GENERATE_CHUNK, count - inserted))]
+        n, durations = timed(lambda: model.insert_trades(chunk))
+        inserted += n
+        elapsed += durations[0]
+        del chunk
+    record(results, 'insert_trades', [elapsed], inserted)
+
+    # CSV导入（含解析和校验）
+    csv_path = os.path.join(work_dir, f'bench_{scale_name}.csv')
+    write_csv(csv_path, count)
+    csv_model = DataModel(os.path.join(work_dir, f'csv_{scale_name}.db'))
+    report, durations = timed(lambda: import_csv(csv_path, csv_model))
+    record(results, 'import_csv', durations, report.imported)
+
+    model = fresh_model(db_path)
+    rows, durations = timed(model.get_all_trades, READ_REPEAT)
+    record(results, 'get_all_trades', durations, len(rows))
+    del rows
+
+    def cold_summary():
+        model._cache.clear()
+        return model.get_summary_by_symbol()
+    summary, durations = timed(cold_summary, READ_REPEAT)
+    record(results, 'get_summary_by_symbol', durations, len(summary))
+    summary, durations = timed(model.get_summary_by_symbol, READ_REPEAT)
+    record(results, 'get_summary_by_symbol_cached', durations, len(summary))
+
+    def cold_symbols():
+        model._cache.clear()
+        return model.get_symbols()
+    symbols, durations = timed(cold_symbols, READ_REPEAT)
+    record(results, 'get_symbols', durations, len(symbols))
+
+    def cold_page():
+        model._cache.clear()
+        return model.get_trades_page(count // 2, PAGE_LIMIT, columns=LIST_COLUMNS)
+    page, durations = timed(cold_page, READ_REPEAT)
+    record(results, 'get_trades_page', durations, len(page))
+
+    def cold_walk():
+        model._cache.clear()
+        return walk_pages(model)
+    walked, durations = timed(cold_walk)
+    record(results, 'walk_all_pages', durations, walked)
+
+    iterated, durations = timed(lambda: sum(1 for _ in model.iter_trades(columns=LIST_COLUMNS)))
+    record(results, 'iter_trades', durations, iterated)
+
+    # 列式统计（NumPy）
+    from analytics import TradeColumns, summarize, summarize_by_symbol
+    columns, durations = timed(lambda: TradeColumns.from_model(model))
+    record(results, 'analytics_load', durations, len(columns))
+    _, durations = timed(lambda: (summarize(columns.profit_loss), summarize_by_symbol(columns)), READ_REPEAT)
+    record(results, 'analytics_summarize', durations, len(columns))
+
+    get_manager(db_path).close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DataModel与统计分析的基准测试')
+    parser.add_argument('--scale', action='append', choices=sorted(SCALES), help='可重复指定，默认 1k 和 100k')
+    parser.add_argument('--output', help='结果JSON路径，默认写入 bench_results/ 目录')
+    parser.add_argument('--keep', action='store_true', help='保留临时数据库')
+    args = parser.parse_args(argv)
+
+    scales = args.scale or ['1k', '100k']
+    work_dir = tempfile.mkdtemp(prefix='futures_review_bench_')
+    report = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'scales': {},
+    }
+    try:
+        for scale_name in scales:
+            report['scales'][scale_name] = run_scale(scale_name, SCALES[scale_name], work_dir)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, time.strftime('bench_%Y%m%d_%H%M%S.json'))
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {output}")
+
+
+if __name__ == '__main__':
+    main()
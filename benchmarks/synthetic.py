@@ -0,0 +1,90 @@
+import datetime
+import random
+
+# 固定随机种子，保证每次生成的交易完全一致，便于对比不同版本的基准结果
+DEFAULT_SEED = 20240101
+START_TIME = datetime.datetime(2018, 1, 2, 9, 0)
+
+# (品种, 参考价格)
+SYMBOLS = [
+    ('rb', 3800), ('hc', 3900), ('i', 800), ('j', 2200), ('jm', 1500),
+    ('au', 450), ('ag', 5600), ('cu', 68000), ('al', 19000), ('zn', 21000),
+    ('m', 3200), ('y', 8000), ('p', 7500), ('c', 2500), ('SR', 6000),
+    ('CF', 15000), ('TA', 5800), ('MA', 2600), ('FG', 1500), ('SA', 2000),
+]
+DIRECTIONS = ['多', '空']
+STRATEGIES = ['趋势跟随', '均值回归', '突破', '区间震荡', '事件驱动']
+ENTRY_MODES = ['突破入场', '回调入场', '反转入场']
+ENTRY_SIGNALS = ['假突破', '均线金叉', '放量突破', '顶背离', '底背离', '平台突破', '缩量回调']
+STOP_LOSS_RULES = ['跌破前低止损', '固定2%止损', 'ATR两倍止损']
+TAKE_PROFIT_RULES = ['分批止盈', '移动止盈', '目标位止盈']
+EMOTIONS = ['平静', '焦虑', '贪婪', '恐惧', '自信', '犹豫']
+BOUNDARY_MAS = ['5', '10', '20', '30', '60', '120']
+EXIT_SIGNALS = ['触及止损', '达到目标', '信号反转', '时间止损']
+CYCLES = [1, 5, 15, 30, 60, 240]
+
+# 规模名称与交易笔数
+SCALES = {
+    '1k': 1000,
+    '100k': 100000,
+    '1m': 1000000,
+}
+
+
+def format_trade_time(moment):
+    return f"{moment.year}年{moment.month:02d}月{moment.day:02d}日{moment.hour:02d}时{moment.minute:02d}分"
+
+
+def generate_trades(count, seed=DEFAULT_SEED):
+    # 逐条生成trade_data字典（与录入界面字段一致），不在内存中保留整个日志
+    rng = random.Random(seed)
+    moment = START_TIME
+    for _ in range(count):
+        symbol, base_price = rng.choice(SYMBOLS)
+        moment += datetime.timedelta(minutes=rng.randint(5, 240))
+        holding = datetime.timedelta(minutes=rng.randint(5, 60 * 24 * 5))
+        open_price = round(base_price * (1 + rng.gauss(0, 0.08)), 2)
+        move = round(open_price * rng.gauss(0.001, 0.012), 2)
+        # 约一成交易有加仓和对应的减仓
+        add_price = reduce_price = 0.0
+        if rng.random() < 0.1:
+            add_price = round(open_price * (1 + rng.gauss(0, 0.005)), 2)
+            reduce_price = round(add_price + move * rng.random(), 2)
+        cycle = rng.choice(CYCLES)
+        yield {
+            'symbol': symbol,
+            'direction': rng.choice(DIRECTIONS),
+            'open_time': format_trade_time(moment),
+            'open_cycle': cycle,
+            'open_boundary_ma': rng.choice(BOUNDARY_MAS),
+            'target_boundary_ma': rng.choice(BOUNDARY_MAS),
+            'drive_strategy': rng.choice(STRATEGIES),
+            'entry_mode': rng.choice(ENTRY_MODES),
+            'entry_signal': rng.choice(ENTRY_SIGNALS),
+            'stop_loss_rule': rng.choice(STOP_LOSS_RULES),
+            'take_profit_rule': rng.choice(TAKE_PROFIT_RULES),
+            'open_emotion': rng.choice(EMOTIONS),
+            'open_price': open_price,
+            'drawdown': round(abs(rng.gauss(0, open_price * 0.005)), 2),
+            'add_price': add_price,
+            'add_price1': 0.0,
+            'reduce_price': reduce_price,
+            'reduce_price1': 0.0,
+            'close_cycle': cycle,
+            'close_time': format_trade_time(moment + holding),
+            'close_boundary_ma': rng.choice(BOUNDARY_MAS),
+            'exit_signal': rng.choice(EXIT_SIGNALS),
+            'close_emotion': rng.choice(EMOTIONS),
+            'close_price': round(open_price + move, 2),
+        }
+
+
+def write_csv(path, count, seed=DEFAULT_SEED):
+    # 生成可直接用 trade_import.py 导入的CSV
+    import csv
+    from data_model import TRADE_FIELDS
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(TRADE_FIELDS)
+        for trade_data in generate_trades(count, seed):
+            writer.writerow([trade_data[field] for field in TRADE_FIELDS])
@@ -0,0 +1,136 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# 图表PNG的磁盘缓存目录和保留数量
+CHART_CACHE_DIR = 'chart_cache'
+DISK_CACHE_ENTRIES = 32
+# 内存中保留的PNG数量
+MEMORY_CACHE_ENTRIES = 16
+# 默认图表尺寸（英寸）和分辨率
+CHART_SIZE = (8, 4.8)
+CHART_DPI = 100
+
+CHART_TITLES = {
+    'profit_loss': '总盈亏（按品种）',
+    'win_rate': '胜率（按品种）',
+}
+
+
+def summary_version(summary):
+    # 汇总数据的内容指纹，作为跨进程稳定的数据版本
+    payload = json.dumps([list(row) for row in summary], ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ChartRenderer:
+    # 在后台线程用Agg后端把图表渲染为PNG，结果按数据版本和图表参数缓存在内存和磁盘
+    def __init__(self, cache_dir=CHART_CACHE_DIR, font_path=None):
+        self.cache_dir = cache_dir
+        self.font_path = font_path
+        # matplotlib不是线程安全的，单个工作线程串行渲染
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart-render')
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def chart_key(self, kind, data_version, **params):
+        payload = json.dumps({'kind': kind, 'version': data_version, 'params': params}, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def cached_png(self, key):
+        with self._lock:
+            png = self._memory.get(key)
+            if png is not None:
+                self._memory.move_to_end(key)
+                return png
+        path = self._cache_path(key)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                png = f.read()
+            self._remember(key, png)
+            return png
+        return None
+
+    def render_async(self, kind, summary, callback, **params):
+        # callback(key, png) 在工作线程中调用，由调用方负责切回UI线程
+        key = self.chart_key(kind, summary_version(summary), **params)
+        return self._executor.submit(self._render_job, key, kind, summary, params, callback)
+
+    def _render_job(self, key, kind, summary, params, callback):
+        png = self.cached_png(key)
+        if png is None:
+            png = self.render_png(kind, summary, **params)
+            self._remember(key, png)
+            self._store(key, png)
+        callback(key, png)
+        return png
+
+    def render_png(self, kind, summary, size=CHART_SIZE, dpi=CHART_DPI):
+        # 延迟导入matplotlib，只在第一次画图时付出导入代价
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.font_manager import FontProperties
+
+        font = FontProperties(fname=self.font_path) if self.font_path else None
+        symbols = [row[0] for row in summary]
+        if kind == 'profit_loss':
+            values = [row[2] or 0.0 for row in summary]
+        elif kind == 'win_rate':
+            values = [(row[3] / row[1] * 100) if row[1] else 0.0 for row in summary]
+        else:
+            raise ValueError(f"未知的图表类型: {kind}")
+
+        fig = Figure(figsize=size, dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
+        colors = ['#d9534f' if value >= 0 else '#5cb85c' for value in values]
+        ax.bar(range(len(values)), values, color=colors)
+        ax.set_xticks(range(len(symbols)))
+        ax.set_xticklabels(symbols, fontproperties=font, rotation=45 if len(symbols) > 8 else 0)
+        ax.set_title(CHART_TITLES[kind], fontproperties=font)
+        if kind == 'win_rate':
+            ax.set_ylim(0, 100)
+            ax.set_ylabel('%')
+        ax.axhline(0, color='#888888', linewidth=0.8)
+        fig.tight_layout()
+
+        buf = io.BytesIO()
+        fig.canvas.print_png(buf)
+        return buf.getvalue()
+
+    def _remember(self, key, png):
+        with self._lock:
+            self._memory[key] = png
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_CACHE_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.png')
+
+    def _store(self, key, png):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._cache_path(key) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(png)
+            os.replace(tmp_path, self._cache_path(key))
+            self._prune_disk_cache()
+        except OSError:
+            # 磁盘缓存失败不影响显示
+            pass
+
+    def _prune_disk_cache(self):
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.png')]
+        if len(files) <= DISK_CACHE_ENTRIES:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:-DISK_CACHE_ENTRIES]:
+            os.remove(path)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
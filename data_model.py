@@ -1,31 +1,67 @@
-import sqlite3
-import os
+from contextlib import contextmanager
 
-class DataModel:
-    def __init__(self):
-        self.db_path = 'futures_review.db'
-        self._create_tables()
-    
-    def _create_tables(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 创建交易记录表格
-        cursor.execute('''
+from db_connection import get_manager
+from trade_time import parse_trade_time, to_epoch, period_bucket
+from query_cache import QueryCache
+from pnl import ContractSpec, DEFAULT_SYMBOL, DIRECTION_SIGNS, PRICE_FIELDS, SPEC_COLUMNS, get_model
+import migrations
+import query_profiler
+
+DEFAULT_DB_PATH = 'futures_review.db'
+
+# 录入字段（与trades表列顺序一致，不含id、盈亏和创建时间）
+TRADE_FIELDS = [
+    'symbol', 'direction', 'open_time', 'open_cycle', 'open_boundary_ma', 'target_boundary_ma',
+    'drive_strategy', 'entry_mode', 'entry_signal', 'stop_loss_rule', 'take_profit_rule',
+    'open_emotion', 'open_price', 'drawdown', 'add_price', 'add_price1', 'reduce_price', 'reduce_price1',
+    'close_cycle', 'close_time', 'close_boundary_ma', 'exit_signal', 'close_emotion', 'close_price'
+]
+# trades表的全部列，用于校验查询时指定的列名
+TRADE_COLUMNS = ['id'] + TRADE_FIELDS + ['profit_loss', 'created_at', 'open_ts', 'close_ts', 'holding_seconds', 'quantity']
+# 列表展示只需要的列
+LIST_COLUMNS = ['id', 'symbol', 'open_time', 'close_time', 'profit_loss']
+INTEGER_FIELDS = ['open_cycle', 'close_cycle']
+FLOAT_FIELDS = ['open_price', 'drawdown', 'add_price', 'add_price1', 'reduce_price', 'reduce_price1', 'close_price']
+# 手数为可选录入项，旧数据和未填写时按1手
+DEFAULT_QUANTITY = 1
+
+# 批量写入时每个事务的行数
+BULK_CHUNK_SIZE = 5000
+# 分页和流式读取的默认批大小
+PAGE_SIZE = 100
+ITER_BATCH_SIZE = 1000
+
+# 取值高度重复的文本字段：trades表中只存 text_values 的整数id（列名加 _id 后缀）
+ENCODED_FIELDS = [
+    'direction', 'open_boundary_ma', 'target_boundary_ma', 'drive_strategy', 'entry_mode', 'entry_signal',
+    'stop_loss_rule', 'take_profit_rule', 'open_emotion', 'close_boundary_ma', 'exit_signal', 'close_emotion'
+]
+_ENCODED_POSITIONS = [TRADE_FIELDS.index(field) for field in ENCODED_FIELDS]
+
+def stored_column(column):
+    return f'{column}_id' if column in ENCODED_FIELDS else column
+
+_TEXT_VALUES_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS text_values (
+            id INTEGER PRIMARY KEY,
+            value TEXT NOT NULL UNIQUE
+        )'''
+
+_TRADES_TABLE_SQL = '''
         CREATE TABLE IF NOT EXISTS trades (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             symbol TEXT NOT NULL,
-            direction TEXT NOT NULL,
+            direction_id INTEGER NOT NULL,
             open_time TEXT NOT NULL,
             open_cycle INTEGER NOT NULL,
-            open_boundary_ma TEXT NOT NULL,
-            target_boundary_ma TEXT NOT NULL,
-            drive_strategy TEXT NOT NULL,
-            entry_mode TEXT NOT NULL,
-            entry_signal TEXT NOT NULL,
-            stop_loss_rule TEXT NOT NULL,
-            take_profit_rule TEXT NOT NULL,
-            open_emotion TEXT NOT NULL,
+            open_boundary_ma_id INTEGER NOT NULL,
+            target_boundary_ma_id INTEGER NOT NULL,
+            drive_strategy_id INTEGER NOT NULL,
+            entry_mode_id INTEGER NOT NULL,
+            entry_signal_id INTEGER NOT NULL,
+            stop_loss_rule_id INTEGER NOT NULL,
+            take_profit_rule_id INTEGER NOT NULL,
+            open_emotion_id INTEGER NOT NULL,
             open_price REAL NOT NULL,
             drawdown REAL NOT NULL,
             add_price REAL NOT NULL,
@@ -34,87 +70,806 @@ class DataModel:
             reduce_price1 REAL NOT NULL,
             close_cycle INTEGER NOT NULL,
             close_time TEXT NOT NULL,
-            close_boundary_ma TEXT NOT NULL,
-            exit_signal TEXT NOT NULL,
-            close_emotion TEXT NOT NULL,
+            close_boundary_ma_id INTEGER NOT NULL,
+            exit_signal_id INTEGER NOT NULL,
+            close_emotion_id INTEGER NOT NULL,
             close_price REAL NOT NULL,
             profit_loss REAL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )''')
-        
-        conn.commit()
-        conn.close()
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            open_ts INTEGER,
+            close_ts INTEGER,
+            holding_seconds INTEGER,
+            quantity REAL NOT NULL DEFAULT 1
+        )'''
+
+# 对外读取统一走这个视图，列名和列顺序与编码前的trades表一致
+def trade_records_view_sql(columns=TRADE_COLUMNS):
+    # 迁移到中间版本时表中还没有全部列，只用已有的列建视图
+    return '''
+        CREATE VIEW IF NOT EXISTS trade_records AS
+        SELECT
+            {columns}
+        FROM trades t
+        {joins}'''.format(
+        columns=',\n            '.join(
+            f'v_{column}.value AS {column}' if column in ENCODED_FIELDS else f't.{column}' for column in columns
+        ),
+        joins='\n        '.join(
+            f'LEFT JOIN text_values v_{field} ON v_{field}.id = t.{field}_id' for field in ENCODED_FIELDS
+        ),
+    )
+
+_TRADE_RECORDS_VIEW_SQL = trade_records_view_sql()
+
+_INSERT_COLUMNS = [stored_column(field) for field in TRADE_FIELDS] + ['profit_loss', 'open_ts', 'close_ts', 'holding_seconds', 'quantity']
+_INSERT_SQL = f'''
+        INSERT INTO trades ({', '.join(_INSERT_COLUMNS)})
+        VALUES ({', '.join('?' for _ in _INSERT_COLUMNS)})
+        '''
+
+# 由时间文本解析出的列：开平仓时间戳和持仓时长（秒）
+TIMESTAMP_COLUMNS = [
+    ('open_ts', 'INTEGER'),
+    ('close_ts', 'INTEGER'),
+    ('holding_seconds', 'INTEGER'),
+]
+
+# 按品种的物化汇总表，由trades上的触发器增量维护
+SUMMARY_COLUMNS = [
+    'symbol', 'total_trades', 'total_profit_loss', 'winning_trades', 'losing_trades',
+    'gross_profit', 'gross_loss', 'best_trade', 'worst_trade'
+]
+
+_SUMMARY_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS symbol_summary (
+            symbol TEXT PRIMARY KEY,
+            total_trades INTEGER NOT NULL DEFAULT 0,
+            total_profit_loss REAL NOT NULL DEFAULT 0,
+            winning_trades INTEGER NOT NULL DEFAULT 0,
+            losing_trades INTEGER NOT NULL DEFAULT 0,
+            gross_profit REAL NOT NULL DEFAULT 0,
+            gross_loss REAL NOT NULL DEFAULT 0,
+            best_trade REAL,
+            worst_trade REAL
+        )'''
+
+# 按任意分组表达式聚合的统计列，与SUMMARY_COLUMNS顺序一致
+_GROUP_STATISTICS_SQL = '''
+        SELECT
+            {group} AS group_key,
+            COUNT(*) AS total_trades,
+            COALESCE(SUM(profit_loss), 0) AS total_profit_loss,
+            SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) AS winning_trades,
+            SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) AS losing_trades,
+            COALESCE(SUM(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END), 0) AS gross_profit,
+            COALESCE(SUM(CASE WHEN profit_loss < 0 THEN -profit_loss ELSE 0 END), 0) AS gross_loss,
+            MAX(profit_loss) AS best_trade,
+            MIN(profit_loss) AS worst_trade
+        FROM trades
+        WHERE group_key IS NOT NULL
+        GROUP BY group_key
+        ORDER BY group_key
+        '''
+
+# 全表聚合，用于重建和校验汇总表
+_SUMMARY_AGGREGATE_SQL = _GROUP_STATISTICS_SQL.format(group='symbol')
+
+# 按平仓时间分周期的分组表达式；周为ISO周（以该周周四所在年份计年）
+_ISO_WEEK_THURSDAY = "date(close_ts, 'unixepoch', '-3 days', 'weekday 4')"
+PERIOD_EXPRESSIONS = {
+    'day': "date(close_ts, 'unixepoch')",
+    'week': f"strftime('%Y', {_ISO_WEEK_THURSDAY}) || '-W' || "
+            f"printf('%02d', (strftime('%j', {_ISO_WEEK_THURSDAY}) - 1) / 7 + 1)",
+    'month': "strftime('%Y-%m', close_ts, 'unixepoch')",
+}
+
+# 可用于分组统计的维度；编码字段按整数id分组，再关联出文本
+GROUP_EXPRESSIONS = dict({
+    'symbol': 'symbol',
+    'strategy': 'drive_strategy_id',
+    'entry_mode': 'entry_mode_id',
+    'direction': 'direction_id',
+}, **PERIOD_EXPRESSIONS)
+
+_ENCODED_GROUP_STATISTICS_SQL = '''
+        SELECT v.value, {columns}
+        FROM ({{inner}}) g
+        JOIN text_values v ON v.id = g.group_key
+        ORDER BY v.value
+        '''.format(columns=', '.join(f'g.{column}' for column in SUMMARY_COLUMNS[1:]))
+
+# 透视分析可任意组合的维度：编码字段按id分组后关联文本，开仓周期和时间周期直接分组
+PIVOT_DIMENSIONS = dict({
+    'drive_strategy': 'drive_strategy_id',
+    'entry_mode': 'entry_mode_id',
+    'open_emotion': 'open_emotion_id',
+    'direction': 'direction_id',
+    'open_cycle': 'open_cycle',
+}, **PERIOD_EXPRESSIONS)
+PIVOT_MEASURES = ['total_trades', 'total_profit_loss', 'winning_trades', 'losing_trades', 'win_rate']
+
+# 覆盖索引：透视所需的列都在索引中，聚合只扫描窄索引而不读整行
+_PIVOT_INDEX_SQL = '''
+        CREATE INDEX IF NOT EXISTS idx_trades_pivot ON trades (
+            drive_strategy_id, entry_mode_id, open_emotion_id, direction_id, open_cycle, close_ts, profit_loss
+        )'''
+
+_PIVOT_SQL = '''
+        SELECT {labels}, g.total_trades, g.total_profit_loss, g.winning_trades, g.losing_trades,
+            CAST(g.winning_trades AS REAL) / g.total_trades
+        FROM (
+            SELECT
+                {keys},
+                COUNT(*) AS total_trades,
+                COALESCE(SUM(profit_loss), 0) AS total_profit_loss,
+                SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) AS winning_trades,
+                SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) AS losing_trades
+            FROM trades
+            {where}
+            GROUP BY {group}
+        ) g
+        {joins}
+        ORDER BY {order}
+        '''
+
+# 全文检索的文本字段：FTS5外部内容表，内容来自trade_records视图，由trades上的触发器同步
+SEARCH_FIELDS = [
+    'drive_strategy', 'entry_mode', 'entry_signal', 'stop_loss_rule', 'take_profit_rule',
+    'open_emotion', 'exit_signal', 'close_emotion'
+]
+# trigram分词按三个字符建索引，更短的检索词改用LIKE
+SEARCH_MIN_TERM_LENGTH = 3
+SEARCH_LIMIT = 50
+# 检索结果列：交易列表列 + 高亮摘要
+SEARCH_COLUMNS = LIST_COLUMNS + ['snippet']
+
+_SEARCH_TABLE_SQL = f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS trade_search USING fts5(
+            {', '.join(SEARCH_FIELDS)},
+            content='trade_records', content_rowid='id', tokenize='trigram'
+        )'''
+
+def _search_values(row):
+    return ', '.join(f'(SELECT value FROM text_values WHERE id = {row}.{field}_id)' for field in SEARCH_FIELDS)
+
+_SEARCH_INSERT_SQL = f'''
+            INSERT INTO trade_search (rowid, {', '.join(SEARCH_FIELDS)}) VALUES (new.id, {_search_values('new')});
+'''
+_SEARCH_DELETE_SQL = f'''
+            INSERT INTO trade_search (trade_search, rowid, {', '.join(SEARCH_FIELDS)})
+            VALUES ('delete', old.id, {_search_values('old')});
+'''
+_SEARCH_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS trg_trades_search_insert AFTER INSERT ON trades BEGIN
+{_SEARCH_INSERT_SQL}        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_trades_search_delete AFTER DELETE ON trades BEGIN
+{_SEARCH_DELETE_SQL}        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_trades_search_update
+        AFTER UPDATE OF {', '.join(f'{field}_id' for field in SEARCH_FIELDS)} ON trades BEGIN
+{_SEARCH_DELETE_SQL}{_SEARCH_INSERT_SQL}        END''',
+]
+
+_SEARCH_SQL = '''
+        SELECT t.id, t.symbol, t.open_time, t.close_time, t.profit_loss,
+            snippet(trade_search, -1, ?, ?, '…', 12)
+        FROM trade_search
+        JOIN trades t ON t.id = trade_search.rowid
+        WHERE trade_search MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        '''
+
+# 新增一笔交易对汇总行的影响
+_SUMMARY_ADD_SQL = '''
+            INSERT OR IGNORE INTO symbol_summary (symbol) VALUES (new.symbol);
+            UPDATE symbol_summary SET
+                total_trades = total_trades + 1,
+                total_profit_loss = total_profit_loss + COALESCE(new.profit_loss, 0),
+                winning_trades = winning_trades + (CASE WHEN new.profit_loss > 0 THEN 1 ELSE 0 END),
+                losing_trades = losing_trades + (CASE WHEN new.profit_loss < 0 THEN 1 ELSE 0 END),
+                gross_profit = gross_profit + (CASE WHEN new.profit_loss > 0 THEN new.profit_loss ELSE 0 END),
+                gross_loss = gross_loss + (CASE WHEN new.profit_loss < 0 THEN -new.profit_loss ELSE 0 END),
+                best_trade = CASE WHEN best_trade IS NULL OR new.profit_loss > best_trade
+                    THEN COALESCE(new.profit_loss, best_trade) ELSE best_trade END,
+                worst_trade = CASE WHEN worst_trade IS NULL OR new.profit_loss < worst_trade
+                    THEN COALESCE(new.profit_loss, worst_trade) ELSE worst_trade END
+            WHERE symbol = new.symbol;
+'''
+
+# 移除一笔交易对汇总行的影响；只有删掉的恰好是最好/最差交易时才重新查询极值
+_SUMMARY_REMOVE_SQL = '''
+            UPDATE symbol_summary SET
+                total_trades = total_trades - 1,
+                total_profit_loss = total_profit_loss - COALESCE(old.profit_loss, 0),
+                winning_trades = winning_trades - (CASE WHEN old.profit_loss > 0 THEN 1 ELSE 0 END),
+                losing_trades = losing_trades - (CASE WHEN old.profit_loss < 0 THEN 1 ELSE 0 END),
+                gross_profit = gross_profit - (CASE WHEN old.profit_loss > 0 THEN old.profit_loss ELSE 0 END),
+                gross_loss = gross_loss - (CASE WHEN old.profit_loss < 0 THEN -old.profit_loss ELSE 0 END),
+                best_trade = CASE WHEN old.profit_loss >= best_trade
+                    THEN (SELECT MAX(profit_loss) FROM trades WHERE symbol = old.symbol) ELSE best_trade END,
+                worst_trade = CASE WHEN old.profit_loss <= worst_trade
+                    THEN (SELECT MIN(profit_loss) FROM trades WHERE symbol = old.symbol) ELSE worst_trade END
+            WHERE symbol = old.symbol;
+            DELETE FROM symbol_summary WHERE symbol = old.symbol AND total_trades <= 0;
+'''
+
+_SUMMARY_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS trg_trades_summary_insert AFTER INSERT ON trades BEGIN
+{_SUMMARY_ADD_SQL}        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_trades_summary_delete AFTER DELETE ON trades BEGIN
+{_SUMMARY_REMOVE_SQL}        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_trades_summary_update AFTER UPDATE OF symbol, profit_loss ON trades BEGIN
+{_SUMMARY_REMOVE_SQL}{_SUMMARY_ADD_SQL}        END''',
+]
+
+# 按日/周/月和品种预聚合的盈亏表，由trades上的触发器增量维护；无法解析平仓时间的交易不计入
+ROLLUP_COLUMNS = ['bucket', 'total_trades', 'total_profit_loss', 'winning_trades', 'losing_trades']
+
+_ROLLUP_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS pl_rollup (
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            total_trades INTEGER NOT NULL,
+            total_profit_loss REAL NOT NULL,
+            winning_trades INTEGER NOT NULL,
+            losing_trades INTEGER NOT NULL,
+            PRIMARY KEY (period, bucket, symbol)
+        ) WITHOUT ROWID'''
+
+def _rollup_add_sql(period):
+    bucket = PERIOD_EXPRESSIONS[period].replace('close_ts', 'new.close_ts')
+    return f'''
+            INSERT INTO pl_rollup (period, bucket, symbol, total_trades, total_profit_loss, winning_trades, losing_trades)
+            SELECT '{period}', {bucket}, new.symbol, 1, COALESCE(new.profit_loss, 0),
+                CASE WHEN new.profit_loss > 0 THEN 1 ELSE 0 END,
+                CASE WHEN new.profit_loss < 0 THEN 1 ELSE 0 END
+            WHERE new.close_ts IS NOT NULL
+            ON CONFLICT (period, bucket, symbol) DO UPDATE SET
+                total_trades = total_trades + 1,
+                total_profit_loss = total_profit_loss + excluded.total_profit_loss,
+                winning_trades = winning_trades + excluded.winning_trades,
+                losing_trades = losing_trades + excluded.losing_trades;
+'''
+
+def _rollup_remove_sql(period):
+    bucket = PERIOD_EXPRESSIONS[period].replace('close_ts', 'old.close_ts')
+    return f'''
+            UPDATE pl_rollup SET
+                total_trades = total_trades - 1,
+                total_profit_loss = total_profit_loss - COALESCE(old.profit_loss, 0),
+                winning_trades = winning_trades - (CASE WHEN old.profit_loss > 0 THEN 1 ELSE 0 END),
+                losing_trades = losing_trades - (CASE WHEN old.profit_loss < 0 THEN 1 ELSE 0 END)
+            WHERE period = '{period}' AND bucket = {bucket} AND symbol = old.symbol;
+            DELETE FROM pl_rollup WHERE period = '{period}' AND bucket = {bucket} AND symbol = old.symbol
+                AND total_trades <= 0;
+'''
+
+_ROLLUP_ADD_SQL = ''.join(_rollup_add_sql(period) for period in PERIOD_EXPRESSIONS)
+_ROLLUP_REMOVE_SQL = ''.join(_rollup_remove_sql(period) for period in PERIOD_EXPRESSIONS)
+_ROLLUP_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS trg_trades_rollup_insert AFTER INSERT ON trades BEGIN
+{_ROLLUP_ADD_SQL}        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_trades_rollup_delete AFTER DELETE ON trades BEGIN
+{_ROLLUP_REMOVE_SQL}        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_trades_rollup_update AFTER UPDATE OF symbol, profit_loss, close_ts ON trades BEGIN
+{_ROLLUP_REMOVE_SQL}{_ROLLUP_ADD_SQL}        END''',
+]
+
+# 历史修订号：已有交易被修改或删除时加一，供快照和滚动指标判断是否需要全量重建
+_META_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS trade_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )'''
+_REVISION_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS trg_trades_revision_update AFTER UPDATE ON trades BEGIN
+            UPDATE trade_meta SET value = value + 1 WHERE key = 'history_revision';
+        END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_trades_revision_delete AFTER DELETE ON trades BEGIN
+            UPDATE trade_meta SET value = value + 1 WHERE key = 'history_revision';
+        END''',
+]
+
+# 各品种的合约规格和盈亏模型（见pnl.py）；symbol为 '*' 的行是未单独配置品种的默认规格
+_CONTRACT_SPECS_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS contract_specs (
+            symbol TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            multiplier REAL NOT NULL DEFAULT 1,
+            commission REAL NOT NULL DEFAULT 0,
+            slippage REAL NOT NULL DEFAULT 0
+        )'''
+# 重算盈亏时读取的列
+_RECOMPUTE_COLUMNS = ['id', 'direction_id', 'quantity', 'profit_loss'] + PRICE_FIELDS
+
+# 汇总表与全表聚合比对时允许的浮点误差
+SUMMARY_TOLERANCE = 1e-6
+
+def calculate_profit_loss(trade_data):
+    # 默认规格（legacy模型）的盈亏公式；按合约规格计算用 DataModel.profit_loss
+    return round(trade_data['reduce_price'], 2) + round(trade_data['reduce_price1'], 2) + round(trade_data['close_price'], 2) - \
+           round(trade_data['open_price'], 2) - round(trade_data['add_price'], 2) - round(trade_data['add_price1'], 2)
+
+def _select_list(columns):
+    unknown = [column for column in columns if column not in TRADE_COLUMNS]
+    if unknown:
+        raise ValueError(f"未知的列: {', '.join(unknown)}")
+    return ', '.join(columns)
+
+def _timestamps(open_time, close_time):
+    open_ts = parse_trade_time(open_time)
+    close_ts = parse_trade_time(close_time)
+    holding = close_ts - open_ts if open_ts is not None and close_ts is not None else None
+    return open_ts, close_ts, holding
+
+def _trade_row(trade_data, pl):
+    return tuple(trade_data[field] for field in TRADE_FIELDS) + (pl,) + \
+        _timestamps(trade_data['open_time'], trade_data['close_time']) + \
+        (trade_data.get('quantity', DEFAULT_QUANTITY),)
+
+def rebuild_summary_table(conn):
+    conn.execute('DELETE FROM symbol_summary')
+    conn.execute(f"INSERT INTO symbol_summary ({', '.join(SUMMARY_COLUMNS)}) {_SUMMARY_AGGREGATE_SQL}")
+
+def rebuild_rollup_table(conn):
+    conn.execute('DELETE FROM pl_rollup')
+    for period, expression in PERIOD_EXPRESSIONS.items():
+        conn.execute(f'''
+        INSERT INTO pl_rollup (period, bucket, symbol, total_trades, total_profit_loss, winning_trades, losing_trades)
+        SELECT ?, {expression} AS bucket, symbol, COUNT(*), COALESCE(SUM(profit_loss), 0),
+            SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END)
+        FROM trades
+        WHERE close_ts IS NOT NULL
+        GROUP BY bucket, symbol
+        ''', (period,))
+
+def load_contract_specs(conn):
+    return {row[0]: ContractSpec(*row) for row in conn.execute(f"SELECT {', '.join(SPEC_COLUMNS)} FROM contract_specs")}
+
+def _spec_for(specs, symbol):
+    return specs.get(symbol) or specs.get(DEFAULT_SYMBOL) or ContractSpec()
+
+def recompute_profit_loss(conn, symbols=None):
+    # 在调用方的写事务内按品种重算盈亏：每个品种一次读取、NumPy整列计算，只回写有变化的行。
+    # symbols为None时重算全部品种；返回更新的行数
+    import numpy as np
+    specs = load_contract_specs(conn)
+    if symbols is None:
+        symbols = [row[0] for row in conn.execute('SELECT DISTINCT symbol FROM trades')]
+    direction_ids = {value: text_id for text_id, value in conn.execute(
+        f"SELECT id, value FROM text_values WHERE value IN ({', '.join('?' for _ in DIRECTION_SIGNS)})",
+        list(DIRECTION_SIGNS)
+    )}
+    updated = 0
+    for symbol in symbols:
+        spec = _spec_for(specs, symbol)
+        rows = conn.execute(
+            f"SELECT {', '.join(_RECOMPUTE_COLUMNS)} FROM trades WHERE symbol = ?", (symbol,)
+        ).fetchall()
+        if not rows:
+            continue
+        # profit_loss为NULL的行读成NaN，与任何新值都不相等，一定会回写
+        data = np.array(rows, dtype=np.float64)
+        columns = dict(zip(_RECOMPUTE_COLUMNS, data.T))
+        signs = np.ones(len(rows))
+        for direction, sign in DIRECTION_SIGNS.items():
+            if direction in direction_ids:
+                signs[columns['direction_id'] == direction_ids[direction]] = sign
+        values = get_model(spec.model).profit_loss_array(columns, signs, columns['quantity'], spec)
+        changed = values != columns['profit_loss']
+        if changed.any():
+            ids = np.asarray([row[0] for row in rows])[changed]
+            conn.executemany(
+                'UPDATE trades SET profit_loss = ? WHERE id = ?', zip(values[changed].tolist(), ids.tolist())
+            )
+            updated += int(changed.sum())
+    return updated
+
+class DataModel:
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        # 所有界面共享同一个进程级连接管理器
+        self._db = get_manager(db_path)
+        # 按 PRAGMA user_version 执行未完成的结构迁移；结构已是最新时只读一次pragma
+        self._db.initialize(migrations.migrate)
+        # 查询结果缓存：数据未变化时切换界面不再执行SQL
+        self._cache = QueryCache()
+        # 文本值到text_values id的内存映射，首次写入时加载
+        self._text_ids = None
+        # 是否有FTS5全文索引，首次检索时检查
+        self._search_index = None
+        # (data_version, {品种: ContractSpec})，数据版本变化后重新加载，其他实例或进程修改的规格也能生效
+        self._specs = None
+    
+    def _reader(self):
+        # 开启查询分析（query_profiler）时返回计时包装的连接
+        profiler = query_profiler.get_profiler()
+        return self._db.reader() if profiler is None else profiler.wrap(self._db.reader())
+    
+    @contextmanager
+    def _writer(self):
+        with self._db.writer() as conn:
+            profiler = query_profiler.get_profiler()
+            yield conn if profiler is None else profiler.wrap(conn)
+    
+    def _load_text_ids(self):
+        if self._text_ids is None:
+            self._text_ids = {value: text_id for text_id, value in self._fetchall('SELECT id, value FROM text_values')}
+        return self._text_ids
+    
+    def _encode_rows(self, conn, rows, new_values):
+        # 在写事务内把文本字段换成id；新出现的文本先写入text_values
+        text_ids = self._load_text_ids()
+        encoded = []
+        for row in rows:
+            row = list(row)
+            for position in _ENCODED_POSITIONS:
+                value = row[position]
+                text_id = text_ids.get(value)
+                if text_id is None:
+                    found = conn.execute('SELECT id FROM text_values WHERE value = ?', (value,)).fetchone()
+                    if found:
+                        text_id = found[0]
+                    else:
+                        text_id = conn.execute('INSERT INTO text_values (value) VALUES (?)', (value,)).lastrowid
+                        new_values.append(value)
+                    text_ids[value] = text_id
+                row[position] = text_id
+            encoded.append(row)
+        return encoded
+    
+    def _write_rows(self, rows, meta=None):
+        # meta: 需要与这些行在同一事务中写入trade_meta的 {键: 值}
+        new_values = []
+        try:
+            with self._writer() as conn:
+                conn.executemany(_INSERT_SQL, self._encode_rows(conn, rows, new_values))
+                for key, value in (meta or {}).items():
+                    conn.execute('INSERT OR REPLACE INTO trade_meta (key, value) VALUES (?, ?)', (key, value))
+        except BaseException:
+            # 事务回滚后，本次新分配的文本id已失效
+            for value in new_values:
+                self._text_ids.pop(value, None)
+            raise
+        self._cache.clear()
+    
+    def _fetchall(self, sql, params=()):
+        return self._reader().execute(sql, params).fetchall()
+    
+    def _cached_fetchall(self, sql, params=()):
+        # 以SQL和参数为键读缓存，版本号来自 PRAGMA data_version
+        params = tuple(params)
+        return self._cache.get((sql, params), self.data_version(), lambda: self._fetchall(sql, params))
+    
+    def data_version(self):
+        return self._db.data_version()
+    
+    def _contract_specs(self):
+        version = self.data_version()
+        if self._specs is None or self._specs[0] != version:
+            self._specs = (version, load_contract_specs(self._reader()))
+        return self._specs[1]
+    
+    def profit_loss(self, trade_data, specs=None):
+        # 按该品种的合约规格（没有则用默认规格）计算盈亏；批量计算时由调用方传入同一份specs
+        spec = _spec_for(specs if specs is not None else self._contract_specs(), trade_data['symbol'])
+        return get_model(spec.model).profit_loss(trade_data, spec)
     
     def insert_trade(self, trade_data):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         # 计算盈亏
-        pl = round(trade_data['reduce_price'], 2) + round(trade_data['reduce_price1'], 2) + round(trade_data['close_price'], 2) - \
-             round(trade_data['open_price'], 2) - round(trade_data['add_price'], 2) - round(trade_data['add_price1'], 2)
+        pl = self.profit_loss(trade_data)
         
-        cursor.execute('''
-        INSERT INTO trades (
-            symbol, direction, open_time, open_cycle, open_boundary_ma, target_boundary_ma, 
-            drive_strategy, entry_mode, entry_signal, stop_loss_rule, take_profit_rule, 
-            open_emotion, open_price, drawdown, add_price, add_price1, reduce_price, reduce_price1, 
-            close_cycle, close_time, close_boundary_ma, exit_signal, close_emotion, close_price, profit_loss
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            trade_data['symbol'], trade_data['direction'], trade_data['open_time'], trade_data['open_cycle'],
-            trade_data['open_boundary_ma'], trade_data['target_boundary_ma'], trade_data['drive_strategy'],
-            trade_data['entry_mode'], trade_data['entry_signal'], trade_data['stop_loss_rule'],
-            trade_data['take_profit_rule'], trade_data['open_emotion'], trade_data['open_price'],
-            trade_data['drawdown'], trade_data['add_price'], trade_data['add_price1'],
-            trade_data['reduce_price'], trade_data['reduce_price1'], trade_data['close_cycle'],
-            trade_data['close_time'], trade_data['close_boundary_ma'], trade_data['exit_signal'],
-            trade_data['close_emotion'], trade_data['close_price'], pl
-        ))
+        self._write_rows([_trade_row(trade_data, pl)])
         
-        conn.commit()
-        conn.close()
         return pl
     
+    def insert_trades(self, trades, chunk_size=BULK_CHUNK_SIZE):
+        # 批量写入：每chunk_size行一个事务，使用executemany
+        inserted = 0
+        chunk = []
+        specs = self._contract_specs()
+        for trade_data in trades:
+            chunk.append(_trade_row(trade_data, self.profit_loss(trade_data, specs)))
+            if len(chunk) >= chunk_size:
+                inserted += self._insert_chunk(chunk)
+                chunk = []
+                specs = self._contract_specs()
+        if chunk:
+            inserted += self._insert_chunk(chunk)
+        return inserted
+    
+    def _insert_chunk(self, rows):
+        self._write_rows(rows)
+        return len(rows)
+    
+    def insert_trades_with_meta(self, trades, meta):
+        # 一个事务写入全部交易并更新trade_meta，供写入队列记录已提交的日志序号
+        specs = self._contract_specs()
+        rows = [_trade_row(trade_data, self.profit_loss(trade_data, specs)) for trade_data in trades]
+        self._write_rows(rows, meta)
+        return len(rows)
+    
     def get_all_trades(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM trades')
-        trades = cursor.fetchall()
-        conn.close()
-        return trades
-    
-    def get_trades_by_symbol(self, symbol):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM trades WHERE symbol = ?', (symbol,))
-        trades = cursor.fetchall()
-        conn.close()
-        return trades
+        return self._fetchall('SELECT * FROM trade_records')
+    
+    def get_trades_page(self, after_id=0, limit=PAGE_SIZE, columns=LIST_COLUMNS, symbol=None):
+        # 基于主键的游标分页：只取 id > after_id 的下一页，并只投影需要的列
+        sql = f'SELECT {_select_list(columns)} FROM trade_records WHERE id > ?'
+        params = [after_id]
+        if symbol is not None:
+            sql += ' AND symbol = ?'
+            params.append(symbol)
+        sql += ' ORDER BY id LIMIT ?'
+        params.append(limit)
+        return self._cached_fetchall(sql, params)
+    
+    def iter_trades(self, batch_size=ITER_BATCH_SIZE, columns=TRADE_COLUMNS, after_id=0):
+        # 用fetchmany分批读取，内存占用与交易总数无关
+        cursor = self._reader().execute(
+            f'SELECT {_select_list(columns)} FROM trade_records WHERE id > ? ORDER BY id', (after_id,)
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+    
+    def get_trades_by_symbol(self, symbol, start=None, end=None):
+        # 走 (symbol, open_ts) 索引，可选按开仓时间过滤
+        sql = 'SELECT * FROM trade_records WHERE symbol = ?'
+        params = [symbol]
+        if start is not None:
+            sql += ' AND open_ts >= ?'
+            params.append(to_epoch(start))
+        if end is not None:
+            sql += ' AND open_ts < ?'
+            params.append(to_epoch(end))
+        return self._fetchall(sql + ' ORDER BY open_ts', params)
+    
+    def get_trades_closed_between(self, start=None, end=None):
+        # 按平仓时间范围查询，走 close_ts 索引
+        sql = 'SELECT * FROM trade_records WHERE close_ts IS NOT NULL'
+        params = []
+        if start is not None:
+            sql += ' AND close_ts >= ?'
+            params.append(to_epoch(start))
+        if end is not None:
+            sql += ' AND close_ts < ?'
+            params.append(to_epoch(end))
+        return self._fetchall(sql + ' ORDER BY close_ts', params)
     
     def get_summary_by_symbol(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 使用SQL查询直接汇总数据
-        cursor.execute('''
-        SELECT 
-            symbol, 
-            COUNT(*) as total_trades, 
-            SUM(profit_loss) as total_profit_loss,
-            SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,
-            SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) as losing_trades
-        FROM trades 
-        GROUP BY symbol
+        # 直接读取触发器维护的汇总表，代价只与品种数有关
+        return self._cached_fetchall('''
+        SELECT symbol, total_trades, total_profit_loss, winning_trades, losing_trades
+        FROM symbol_summary
+        ORDER BY symbol
         ''')
-        
-        summary = cursor.fetchall()
-        conn.close()
-        return summary
+    
+    def get_symbol_statistics(self):
+        # 汇总表全部列：含毛盈利、毛亏损、最好和最差交易
+        return self._cached_fetchall(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM symbol_summary ORDER BY symbol")
     
     def get_symbols(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT DISTINCT symbol FROM trades ORDER BY symbol')
-        symbols = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return symbols
\ No newline at end of file
+        return [row[0] for row in self._cached_fetchall('SELECT symbol FROM symbol_summary ORDER BY symbol')]
+    
+    def iter_group_statistics(self, group_by, batch_size=ITER_BATCH_SIZE):
+        # 在SQL中完成分组聚合，按组流式返回，行格式同 get_symbol_statistics
+        if group_by == 'symbol':
+            yield from self.get_symbol_statistics()
+            return
+        if group_by not in GROUP_EXPRESSIONS:
+            raise ValueError(f"未知的分组维度: {group_by}")
+        sql = _GROUP_STATISTICS_SQL.format(group=GROUP_EXPRESSIONS[group_by])
+        if GROUP_EXPRESSIONS[group_by].endswith('_id'):
+            sql = _ENCODED_GROUP_STATISTICS_SQL.format(inner=sql)
+        cursor = self._reader().execute(sql)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+    
+    def get_pivot(self, dimensions, start=None, end=None):
+        # 按维度组合聚合：每行为各维度取值 + PIVOT_MEASURES；可按平仓时间过滤。结果按SQL和数据版本缓存
+        dimensions = list(dimensions)
+        unknown = [dimension for dimension in dimensions if dimension not in PIVOT_DIMENSIONS]
+        if unknown or not dimensions:
+            raise ValueError(f"未知的透视维度: {', '.join(unknown) or '(空)'}")
+        keys, labels, joins = [], [], []
+        for index, dimension in enumerate(dimensions):
+            expression = PIVOT_DIMENSIONS[dimension]
+            keys.append(f'{expression} AS k{index}')
+            if expression.endswith('_id'):
+                joins.append(f'LEFT JOIN text_values v{index} ON v{index}.id = g.k{index}')
+                labels.append(f'v{index}.value')
+            else:
+                labels.append(f'g.k{index}')
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('close_ts >= ?')
+            params.append(to_epoch(start))
+        if end is not None:
+            conditions.append('close_ts < ?')
+            params.append(to_epoch(end))
+        sql = _PIVOT_SQL.format(
+            labels=', '.join(labels),
+            keys=', '.join(keys),
+            where='WHERE ' + ' AND '.join(conditions) if conditions else '',
+            group=', '.join(f'k{index}' for index in range(len(dimensions))),
+            joins='\n        '.join(joins),
+            order=', '.join(f'{index + 1}' for index in range(len(dimensions))),
+        )
+        return self._cached_fetchall(sql, params)
+    
+    def search_trades(self, query, limit=SEARCH_LIMIT, markers=('[', ']')):
+        # 在交易的文本字段中检索，按相关度返回 SEARCH_COLUMNS；摘要中的命中部分用markers包裹
+        terms = query.split()
+        if not terms:
+            return []
+        if self._has_search_index() and all(len(term) >= SEARCH_MIN_TERM_LENGTH for term in terms):
+            # 每个词作为短语加引号，避免用户输入被当作FTS5查询语法
+            match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+            return self._cached_fetchall(_SEARCH_SQL, (markers[0], markers[1], match, limit))
+        return self._search_like(terms, limit, markers)
+    
+    def _has_search_index(self):
+        if self._search_index is None:
+            self._search_index = bool(self._fetchall(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trade_search'"
+            ))
+        return self._search_index
+    
+    def _search_like(self, terms, limit, markers):
+        # 先在很小的text_values表中匹配每个词，再按id筛选交易（每个词都要命中某个字段）；结果按录入时间倒序
+        fields = [f'{field}_id' for field in SEARCH_FIELDS]
+        matched = []
+        for term in terms:
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            values = dict(self._fetchall(
+                "SELECT id, value FROM text_values WHERE value LIKE ? ESCAPE '\\'", (pattern,)
+            ))
+            if not values:
+                return []
+            matched.append((term, values))
+        conditions = []
+        for term, values in matched:
+            ids = ', '.join(str(text_id) for text_id in values)
+            conditions.append('(' + ' OR '.join(f'{field} IN ({ids})' for field in fields) + ')')
+        rows = self._cached_fetchall(f'''
+        SELECT id, symbol, open_time, close_time, profit_loss, {', '.join(fields)}
+        FROM trades
+        WHERE {' AND '.join(conditions)}
+        ORDER BY id DESC
+        LIMIT ?
+        ''', (limit,))
+        results = []
+        for row in rows:
+            snippets = []
+            for term, values in matched:
+                value = next(values[text_id] for text_id in row[5:] if text_id in values)
+                snippet = value.replace(term, f'{markers[0]}{term}{markers[1]}')
+                if snippet not in snippets:
+                    snippets.append(snippet)
+            results.append(row[:5] + ('…'.join(snippets),))
+        return results
+    
+    def get_history_revision(self):
+        return self.get_meta('history_revision')
+    
+    def get_meta(self, key, default=0):
+        row = self._fetchall('SELECT value FROM trade_meta WHERE key = ?', (key,))
+        return row[0][0] if row else default
+    
+    def export_snapshot(self, directory=None):
+        # 导出/增量刷新列式快照（每列一个.npy文件），返回可内存映射打开的快照
+        import snapshot
+        return snapshot.refresh_snapshot(self, directory or snapshot.SNAPSHOT_DIR)
+    
+    def rebuild_symbol_summary(self):
+        with self._writer() as conn:
+            rebuild_summary_table(conn)
+        self._cache.clear()
+    
+    def get_pl_rollup(self, period='month', start=None, end=None, symbol=None):
+        # 读取预聚合的周期盈亏，行格式为 ROLLUP_COLUMNS；不指定品种时合并所有品种。
+        # start/end 换算为所在的桶，返回 [start所在桶, end所在桶) 范围内的行
+        if period not in PERIOD_EXPRESSIONS:
+            raise ValueError(f"未知的周期: {period}")
+        sql = '''
+        SELECT bucket, SUM(total_trades), SUM(total_profit_loss), SUM(winning_trades), SUM(losing_trades)
+        FROM pl_rollup
+        WHERE period = ?'''
+        params = [period]
+        if start is not None:
+            sql += ' AND bucket >= ?'
+            params.append(period_bucket(period, to_epoch(start)))
+        if end is not None:
+            sql += ' AND bucket < ?'
+            params.append(period_bucket(period, to_epoch(end)))
+        if symbol is not None:
+            sql += ' AND symbol = ?'
+            params.append(symbol)
+        return self._cached_fetchall(sql + ' GROUP BY bucket ORDER BY bucket', params)
+    
+    def rebuild_pl_rollup(self):
+        with self._writer() as conn:
+            rebuild_rollup_table(conn)
+        self._cache.clear()
+    
+    def get_contract_specs(self):
+        specs = load_contract_specs(self._reader())
+        return [specs[symbol] for symbol in sorted(specs)]
+    
+    def get_contract_spec(self, symbol):
+        return _spec_for(load_contract_specs(self._reader()), symbol)
+    
+    def set_contract_spec(self, spec):
+        # 保存规格并在同一事务内重算受影响品种的盈亏，返回更新的行数；
+        # 修改默认规格 '*' 影响所有没有单独配置的品种
+        get_model(spec.model)
+        with self._writer() as conn:
+            conn.execute(
+                f'''INSERT INTO contract_specs ({', '.join(SPEC_COLUMNS)}) VALUES ({', '.join('?' for _ in SPEC_COLUMNS)})
+                ON CONFLICT (symbol) DO UPDATE SET model = excluded.model, multiplier = excluded.multiplier,
+                    commission = excluded.commission, slippage = excluded.slippage''',
+                spec.as_row()
+            )
+            updated = recompute_profit_loss(conn, self._affected_symbols(conn, spec.symbol))
+        self._specs = None
+        self._cache.clear()
+        return updated
+    
+    def delete_contract_spec(self, symbol):
+        # 删除单独配置后该品种回到默认规格；默认规格本身不能删除
+        if symbol == DEFAULT_SYMBOL:
+            raise ValueError("默认合约规格不能删除")
+        with self._writer() as conn:
+            conn.execute('DELETE FROM contract_specs WHERE symbol = ?', (symbol,))
+            updated = recompute_profit_loss(conn, [symbol])
+        self._specs = None
+        self._cache.clear()
+        return updated
+    
+    def _affected_symbols(self, conn, symbol):
+        if symbol != DEFAULT_SYMBOL:
+            return [symbol]
+        return [row[0] for row in conn.execute(
+            'SELECT DISTINCT symbol FROM trades WHERE symbol NOT IN (SELECT symbol FROM contract_specs)'
+        )]
+    
+    def recompute_profit_loss(self, symbols=None):
+        # 按当前合约规格全量重算（例如规格表被外部修改后），返回更新的行数
+        with self._writer() as conn:
+            updated = recompute_profit_loss(conn, symbols)
+        self._specs = None
+        self._cache.clear()
+        return updated
+    
+    def verify_symbol_summary(self):
+        # 与全表聚合逐项比对，返回不一致项 (品种, 列名, 期望值, 实际值)
+        expected = {row[0]: row for row in self._fetchall(_SUMMARY_AGGREGATE_SQL)}
+        actual = {row[0]: row for row in self._fetchall(f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM symbol_summary")}
+        mismatches = []
+        for symbol in sorted(set(expected) | set(actual)):
+            expected_row = expected.get(symbol)
+            actual_row = actual.get(symbol)
+            if expected_row is None or actual_row is None:
+                mismatches.append((symbol, 'symbol', expected_row is not None, actual_row is not None))
+                continue
+            for column, want, got in zip(SUMMARY_COLUMNS[1:], expected_row[1:], actual_row[1:]):
+                if want is None or got is None:
+                    if want != got:
+                        mismatches.append((symbol, column, want, got))
+                elif abs(want - got) > SUMMARY_TOLERANCE:
+                    mismatches.append((symbol, column, want, got))
+        return mismatches
+
@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# 连接参数：WAL日志 + 较大的页缓存和内存映射，读写互不阻塞
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KB = 16384
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+class ConnectionManager:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._write_lock = threading.RLock()
+        self._init_lock = threading.Lock()
+        self._writer = None
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._probe = None
+        self._probe_lock = threading.Lock()
+        self.initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000.0, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def initialize(self, init_func):
+        # 每个数据库文件在进程内只初始化一次；init_func(manager) 自行管理事务
+        if self.initialized:
+            return
+        with self._init_lock:
+            if not self.initialized:
+                init_func(self)
+                self.initialized = True
+
+    @contextmanager
+    def writer(self):
+        # 单一写连接，串行化所有写事务
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def reader(self):
+        # 每个线程一个长期保持的读连接
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def data_version(self):
+        # 专用连接上的 PRAGMA data_version：任何其他连接（包括本进程的写连接）提交后都会变化
+        with self._probe_lock:
+            if self._probe is None:
+                self._probe = self._connect()
+            return self._probe.execute('PRAGMA data_version').fetchone()[0]
+
+    def close(self):
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._probe_lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
+        self._local = threading.local()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(db_path):
+    # 同一数据库路径在进程内共享一个连接管理器
+    with _managers_lock:
+        manager = _managers.get(db_path)
+        if manager is None:
+            manager = ConnectionManager(db_path)
+            _managers[db_path] = manager
+        return manager
+
+
+def close_all():
+    with _managers_lock:
+        for manager in _managers.values():
+            manager.close()
+        _managers.clear()
@@ -0,0 +1,179 @@
+import argparse
+import csv
+import json
+import sys
+
+from data_model import DataModel, DEFAULT_DB_PATH, SUMMARY_COLUMNS, PERIOD_EXPRESSIONS, TRADE_COLUMNS
+from pnl import ContractSpec, DEFAULT_SYMBOL, MODELS
+import query_profiler
+
+# 命令行入口：不导入Kivy，可在无显示器的服务器上运行
+# 用法示例：python -m futures_review report --db futures_review.db --by symbol --format json
+
+REPORT_DIMENSIONS = ['symbol', 'strategy', 'entry_mode', 'direction', 'period']
+REPORT_COLUMNS = ['dimension', 'group'] + SUMMARY_COLUMNS[1:] + ['win_rate', 'average_profit_loss']
+
+
+def _report_rows(model, dimensions, period):
+    for dimension in dimensions:
+        group_by = period if dimension == 'period' else dimension
+        for row in model.iter_group_statistics(group_by):
+            group, total_trades, total_pl, wins, losses = row[:5]
+            yield [dimension if dimension != 'period' else period, group] + list(row[1:]) + [
+                wins / total_trades if total_trades else 0.0,
+                total_pl / total_trades if total_trades else 0.0,
+            ]
+
+
+def _write_text(rows, out):
+    current = None
+    for row in rows:
+        record = dict(zip(REPORT_COLUMNS, row))
+        if record['dimension'] != current:
+            current = record['dimension']
+            out.write(f"\n== {current} ==\n")
+            out.write(f"{'分组':<16}{'笔数':>8}{'总盈亏':>14}{'胜率':>9}{'平均盈亏':>12}{'最好':>12}{'最差':>12}\n")
+        out.write(
+            f"{str(record['group']):<16}{record['total_trades']:>8}{record['total_profit_loss']:>14.2f}"
+            f"{record['win_rate'] * 100:>8.1f}%{record['average_profit_loss']:>12.2f}"
+            f"{_fmt(record['best_trade']):>12}{_fmt(record['worst_trade']):>12}\n"
+        )
+
+
+def _fmt(value):
+    return '-' if value is None else f'{value:.2f}'
+
+
+def _write_csv(rows, out):
+    writer = csv.writer(out)
+    writer.writerow(REPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+
+
+def _write_json(rows, out):
+    # 逐条写出JSON数组，不在内存中拼接整个报告
+    out.write('[')
+    for index, row in enumerate(rows):
+        out.write(',\n' if index else '\n')
+        out.write(json.dumps(dict(zip(REPORT_COLUMNS, row)), ensure_ascii=False))
+    out.write('\n]\n')
+
+
+WRITERS = {
+    'text': _write_text,
+    'csv': _write_csv,
+    'json': _write_json,
+}
+
+
+def cmd_report(args, out):
+    model = DataModel(args.db)
+    dimensions = args.by or ['symbol', 'strategy', 'period']
+    WRITERS[args.format](_report_rows(model, dimensions, args.period), out)
+    return 0
+
+
+def cmd_export(args, out):
+    # 按批流式导出全部交易
+    model = DataModel(args.db)
+    writer = csv.writer(out)
+    writer.writerow(TRADE_COLUMNS)
+    for row in model.iter_trades(batch_size=args.batch_size):
+        writer.writerow(row)
+    return 0
+
+
+def cmd_import(args, out):
+    from trade_import import import_csv
+    report = import_csv(args.csv_path, DataModel(args.db), encoding=args.encoding)
+    out.write(f"{report}\n")
+    for line_no, reason in report.rejected[:20]:
+        out.write(f"  第{line_no}行: {reason}\n")
+    return 0
+
+
+def cmd_summary(args, out):
+    model = DataModel(args.db)
+    if args.rebuild:
+        model.rebuild_symbol_summary()
+    mismatches = model.verify_symbol_summary()
+    for symbol, column, expected, actual in mismatches:
+        out.write(f"{symbol} {column}: 期望 {expected}，实际 {actual}\n")
+    out.write("品种汇总表一致\n" if not mismatches else f"发现 {len(mismatches)} 处不一致\n")
+    return 1 if mismatches else 0
+
+
+def cmd_spec(args, out):
+    # 不带参数时列出全部合约规格；指定品种时保存规格并重算该品种的盈亏
+    model = DataModel(args.db)
+    if args.symbol is not None:
+        current = model.get_contract_spec(args.symbol)
+        spec = ContractSpec(
+            args.symbol,
+            args.model or current.model,
+            current.multiplier if args.multiplier is None else args.multiplier,
+            current.commission if args.commission is None else args.commission,
+            current.slippage if args.slippage is None else args.slippage,
+        )
+        updated = model.set_contract_spec(spec)
+        out.write(f"已保存 {args.symbol} 的合约规格，重算 {updated} 笔交易的盈亏\n")
+    for spec in model.get_contract_specs():
+        out.write(f"{spec.symbol:<8}{spec.model:<10}乘数 {spec.multiplier:g}  手续费 {spec.commission:g}  滑点 {spec.slippage:g}\n")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='futures_review', description='期货复盘命令行工具')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='数据库文件路径')
+    parser.add_argument('--profile', action='store_true', help='命令结束后在标准错误输出各查询的耗时统计')
+    parser.add_argument('--profile-log', metavar='JSONL', help='同时把每次查询写入JSONL日志（隐含 --profile）')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    report = commands.add_parser('report', help='按品种、策略、周期等输出统计报告')
+    report.add_argument('--db', default=argparse.SUPPRESS)
+    report.add_argument('--by', action='append', choices=REPORT_DIMENSIONS, help='可重复指定，默认 symbol、strategy、period')
+    report.add_argument('--period', choices=sorted(PERIOD_EXPRESSIONS), default='month')
+    report.add_argument('--format', choices=sorted(WRITERS), default='text')
+    report.set_defaults(func=cmd_report)
+
+    export = commands.add_parser('export', help='把全部交易流式导出为CSV')
+    export.add_argument('--db', default=argparse.SUPPRESS)
+    export.add_argument('--batch-size', type=int, default=5000)
+    export.set_defaults(func=cmd_export)
+
+    importer = commands.add_parser('import', help='从CSV批量导入交易')
+    importer.add_argument('csv_path')
+    importer.add_argument('--db', default=argparse.SUPPRESS)
+    importer.add_argument('--encoding', default='utf-8-sig')
+    importer.set_defaults(func=cmd_import)
+
+    summary = commands.add_parser('summary', help='校验品种汇总表，可选先重建')
+    summary.add_argument('--db', default=argparse.SUPPRESS)
+    summary.add_argument('--rebuild', action='store_true')
+    summary.set_defaults(func=cmd_summary)
+
+    spec = commands.add_parser('spec', help='查看或设置合约规格（盈亏模型、乘数、手续费、滑点）')
+    spec.add_argument('symbol', nargs='?', help=f'品种，{DEFAULT_SYMBOL} 为默认规格')
+    spec.add_argument('--db', default=argparse.SUPPRESS)
+    spec.add_argument('--model', choices=sorted(MODELS))
+    spec.add_argument('--multiplier', type=float)
+    spec.add_argument('--commission', type=float, help='每手每次成交的手续费')
+    spec.add_argument('--slippage', type=float, help='每次成交的滑点（价格单位）')
+    spec.set_defaults(func=cmd_spec)
+    return parser
+
+
+def main(argv=None, out=None):
+    args = build_parser().parse_args(argv)
+    profiler = query_profiler.enable(args.profile_log) if args.profile or args.profile_log else None
+    try:
+        return args.func(args, out or sys.stdout)
+    finally:
+        if profiler is not None:
+            query_profiler.disable()
+            sys.stderr.write(profiler.format_report() + '\n')
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
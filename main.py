@@ -1,3 +1,7 @@
+import time
+# 启动计时起点：尽量早于Kivy导入
+_STARTUP_T0 = time.perf_counter()
+
 from kivy.lang import Builder
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.app import App
@@ -8,13 +12,33 @@ from kivy.uix.scrollview import ScrollView
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.popup import Popup
+from kivy.properties import StringProperty, ListProperty
+from kivy.uix.progressbar import ProgressBar
 from kivy.core.text import LabelBase
+from kivy.core.image import Image as CoreImage
+from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.resources import resource_find
-from data_model import DataModel
+from kivy.factory import Factory
+from kivy.utils import escape_markup
+from data_model import DataModel, LIST_COLUMNS, DEFAULT_DB_PATH, DEFAULT_QUANTITY
+from migrations import pending_migrations, migrate, LATEST_VERSION
+from db_connection import close_all, get_manager
+from chart_renderer import ChartRenderer, summary_version
+from async_loader import get_loader
+from trade_writer import get_trade_writer, flush_all_writers, close_all_writers
+import query_profiler
+import perf_overlay
+import io
+import json
 import os
 import sys
 
+# 已解析的字体路径缓存，避免每次启动都探测字体目录
+FONT_CACHE_FILE = 'font_cache.json'
+# 启动耗时记录（每次启动追加一行JSON）
+STARTUP_REPORT_FILE = 'startup_times.jsonl'
+
 # 尝试多种字体路径，确保找到支持中文的字体
 def get_font_path():
     # 尝试系统字体目录
@@ -52,8 +76,26 @@ def get_font_path():
             return path
     return None
 
+def get_cached_font_path():
+    # 优先使用上次解析到的字体路径，文件不存在时重新探测
+    try:
+        with open(FONT_CACHE_FILE, encoding='utf-8') as f:
+            cached = json.load(f).get('font_path')
+        if cached and os.path.exists(cached):
+            return cached
+    except (OSError, ValueError):
+        pass
+    path = get_font_path()
+    if path:
+        try:
+            with open(FONT_CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump({'font_path': path}, f)
+        except OSError:
+            pass
+    return path
+
 # 获取可用的字体路径
-font_path = get_font_path()
+font_path = get_cached_font_path()
 
 # 设置中文字体
 if font_path:
@@ -66,8 +108,9 @@ else:
     LabelBase.register(name='Roboto', fn_regular=resource_find('fonts/Roboto-Regular.ttf'))
     Window.default_font = ['Roboto', 'Roboto-Regular.ttf']
 
-# 加载Kivy语言定义
-Builder.load_string('''
+# Kivy语言定义：按界面拆分，主界面启动时编译，其他界面第一次打开时才编译
+KV_RULES = {
+    'main': '''
 <MainScreen>:
     name: 'main'
     BoxLayout:
@@ -95,7 +138,8 @@ Builder.load_string('''
                 text: '图表分析'
                 on_release: root.manager.current = 'charts'
                 font_name: 'ChineseFont'
-
+''',
+    'input': '''
 <InputScreen>:
     name: 'input'
     ScrollView:
@@ -257,6 +301,12 @@ Builder.load_string('''
                 size_hint_y: None
                 height: 40
                 font_name: 'ChineseFont'
+            TextInput:
+                id: quantity
+                hint_text: '手数（默认1）'
+                size_hint_y: None
+                height: 40
+                font_name: 'ChineseFont'
             
             Button:
                 text: '提交数据'
@@ -270,38 +320,123 @@ Builder.load_string('''
                 size_hint_y: None
                 height: 50
                 font_name: 'ChineseFont'
+''',
+    'analysis': '''
+<TradeRow>:
+    orientation: 'vertical'
+    spacing: 5
+    padding: 10
+    Label:
+        text: root.title
+        font_size: '16sp'
+        bold: True
+        font_name: 'ChineseFont'
+    Label:
+        text: root.times
+        font_name: 'ChineseFont'
+    Label:
+        text: root.profit_loss
+        markup: True
+        font_name: 'ChineseFont'
+
+<PivotOption@SpinnerOption>:
+    font_name: 'ChineseFont'
+
+<PivotCell@Label>:
+    font_name: 'ChineseFont'
+    font_size: '13sp'
 
 <AnalysisScreen>:
     name: 'analysis'
-    ScrollView:
-        GridLayout:
-            cols: 1
-            spacing: 10
-            padding: 10
+    BoxLayout:
+        orientation: 'vertical'
+        spacing: 10
+        padding: 10
+        
+        Label:
+            text: '数据分析'
+            font_size: '20sp'
             size_hint_y: None
-            height: self.minimum_height
-            
-            Label:
-                text: '数据分析'
-                font_size: '20sp'
-                size_hint_y: None
-                height: 40
+            height: 40
+            font_name: 'ChineseFont'
+        
+        # 全文检索：输入为空时恢复完整的交易列表
+        BoxLayout:
+            size_hint_y: None
+            height: 44
+            spacing: 10
+            TextInput:
+                id: search_input
+                hint_text: '检索信号、规则、情绪、策略，如：假突破'
+                multiline: False
                 font_name: 'ChineseFont'
-            
+                on_text_validate: root.search(self.text)
+            Button:
+                text: '检索'
+                size_hint_x: None
+                width: 80
+                font_name: 'ChineseFont'
+                on_release: root.search(search_input.text)
+        
+        # 交易列表：只实例化可见行，滚动到底部时按页加载
+        RecycleView:
+            id: trade_list
+            viewclass: 'TradeRow'
+            on_scroll_y: root.on_trade_list_scroll(self)
+            RecycleBoxLayout:
+                orientation: 'vertical'
+                default_size: None, dp(90)
+                default_size_hint: 1, None
+                size_hint_y: None
+                height: self.minimum_height
+        
+        ScrollView:
+            size_hint_y: 0.4
             BoxLayout:
                 id: analysis_content
                 orientation: 'vertical'
                 spacing: 10
                 size_hint_y: None
                 height: self.minimum_height
-            
-            Button:
-                text: '返回主页'
-                on_release: root.manager.current = 'main'
-                size_hint_y: None
-                height: 50
+        
+        # 透视分析：任选两个维度组合，聚合在SQL中完成
+        BoxLayout:
+            size_hint_y: None
+            height: 44
+            spacing: 10
+            Spinner:
+                id: pivot_first
+                text: '驱动策略'
+                values: root.pivot_choices[1:]
+                option_cls: 'PivotOption'
                 font_name: 'ChineseFont'
-
+                on_text: root.update_pivot()
+            Spinner:
+                id: pivot_second
+                text: '无'
+                values: root.pivot_choices
+                option_cls: 'PivotOption'
+                font_name: 'ChineseFont'
+                on_text: root.update_pivot()
+        
+        ScrollView:
+            size_hint_y: 0.4
+            GridLayout:
+                id: pivot_table
+                cols: 5
+                size_hint_y: None
+                height: self.minimum_height
+                row_default_height: dp(30)
+                row_force_default: True
+        
+        Button:
+            text: '返回主页'
+            on_release: root.manager.current = 'main'
+            size_hint_y: None
+            height: 50
+            font_name: 'ChineseFont'
+''',
+    'charts': '''
 <ChartsScreen>:
     name: 'charts'
     ScrollView:
@@ -319,6 +454,18 @@ Builder.load_string('''
                 height: 40
                 font_name: 'ChineseFont'
             
+            # 图表在后台线程渲染完成后再设置纹理
+            Image:
+                id: profit_loss_chart
+                size_hint_y: None
+                height: dp(300)
+                fit_mode: 'contain'
+            Image:
+                id: win_rate_chart
+                size_hint_y: None
+                height: dp(300)
+                fit_mode: 'contain'
+            
             BoxLayout:
                 id: charts_content
                 orientation: 'vertical'
@@ -332,7 +479,14 @@ Builder.load_string('''
                 size_hint_y: None
                 height: 50
                 font_name: 'ChineseFont'
-''')
+''',
+}
+_loaded_kv = set()
+
+def load_kv(name):
+    if name not in _loaded_kv:
+        Builder.load_string(KV_RULES[name])
+        _loaded_kv.add(name)
 
 class MainScreen(Screen):
     pass
@@ -341,6 +495,8 @@ class InputScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.data_model = DataModel()
+        # 提交交给后台写入队列，界面线程不等待数据库提交
+        self.trade_writer = get_trade_writer(self.data_model)
     
     def submit_data(self):
         # 表单验证
@@ -370,115 +526,546 @@ class InputScreen(Screen):
                 'close_boundary_ma': self.ids.close_boundary_ma.text,
                 'exit_signal': self.ids.exit_signal.text,
                 'close_emotion': self.ids.close_emotion.text,
-                'close_price': float(self.ids.close_price.text) if self.ids.close_price.text else 0.0
+                'close_price': float(self.ids.close_price.text) if self.ids.close_price.text else 0.0,
+                'quantity': float(self.ids.quantity.text) if self.ids.quantity.text else DEFAULT_QUANTITY
             }
             
-            # 插入数据并计算盈亏
-            pl = self.data_model.insert_trade(trade_data)
-            
-            # 显示成功对话框
-            popup_content = BoxLayout(orientation='vertical', padding=10, spacing=10)
-            popup_content.add_widget(Label(text=f"盈亏: {pl:.2f}", font_name='ChineseFont'))
-            ok_button = Button(text="确定", size_hint_y=None, height=40, font_name='ChineseFont')
-            popup = Popup(title="提交成功", content=popup_content, size_hint=(0.6, 0.4))
-            ok_button.bind(on_release=popup.dismiss)
-            popup_content.add_widget(ok_button)
-            popup.open()
-            
-            # 清空表单
-            self.clear_form()
+            # 交给写入队列，写入日志后在回调中显示盈亏
+            future = self.trade_writer.submit(trade_data)
+            future.add_done_callback(lambda done: Clock.schedule_once(lambda dt: self._on_submitted(done)))
         except Exception as e:
-            # 显示错误对话框
-            popup_content = BoxLayout(orientation='vertical', padding=10, spacing=10)
-            popup_content.add_widget(Label(text=f"错误: {str(e)}", font_name='ChineseFont'))
-            ok_button = Button(text="确定", size_hint_y=None, height=40, font_name='ChineseFont')
-            popup = Popup(title="提交失败", content=popup_content, size_hint=(0.6, 0.4))
-            ok_button.bind(on_release=popup.dismiss)
-            popup_content.add_widget(ok_button)
-            popup.open()
+            self._show_error(e)
+    
+    def _on_submitted(self, future):
+        error = future.exception()
+        if error is not None:
+            self._show_error(error)
+            return
+        pl = future.result()
+        
+        # 显示成功对话框
+        popup_content = BoxLayout(orientation='vertical', padding=10, spacing=10)
+        popup_content.add_widget(Label(text=f"盈亏: {pl:.2f}", font_name='ChineseFont'))
+        ok_button = Button(text="确定", size_hint_y=None, height=40, font_name='ChineseFont')
+        popup = Popup(title="提交成功", content=popup_content, size_hint=(0.6, 0.4))
+        ok_button.bind(on_release=popup.dismiss)
+        popup_content.add_widget(ok_button)
+        popup.open()
+        
+        # 清空表单
+        self.clear_form()
+    
+    def _show_error(self, e):
+        # 显示错误对话框
+        popup_content = BoxLayout(orientation='vertical', padding=10, spacing=10)
+        popup_content.add_widget(Label(text=f"错误: {str(e)}", font_name='ChineseFont'))
+        ok_button = Button(text="确定", size_hint_y=None, height=40, font_name='ChineseFont')
+        popup = Popup(title="提交失败", content=popup_content, size_hint=(0.6, 0.4))
+        ok_button.bind(on_release=popup.dismiss)
+        popup_content.add_widget(ok_button)
+        popup.open()
     
     def clear_form(self):
         for key, widget in self.ids.items():
             if isinstance(widget, TextInput):
                 widget.text = ""
 
+class TradeRow(BoxLayout):
+    # RecycleView复用的交易行
+    title = StringProperty('')
+    times = StringProperty('')
+    profit_loss = StringProperty('')
+
+class SummaryPanel(BoxLayout):
+    # 按键复用行控件的汇总面板：update()只改写显示内容变化的行，新出现/消失的键单独添加/移除，
+    # 移除的行放入空闲池供之后复用；数据不变时再次进入界面不创建任何控件
+    def __init__(self, create_row, fill_row, title='', title_font_size='18sp', **kwargs):
+        kwargs.setdefault('orientation', 'vertical')
+        kwargs.setdefault('size_hint_y', None)
+        super().__init__(**kwargs)
+        self.bind(minimum_height=self.setter('height'))
+        self.create_row = create_row
+        self.fill_row = fill_row
+        self.title = Label(text=title, font_size=title_font_size, bold=True, font_name='ChineseFont')
+        # {键: (行控件, 显示内容)}
+        self._rows = {}
+        self._spare = []
+    
+    def has_rows(self):
+        return bool(self._rows)
+    
+    def update(self, items):
+        # items: [(键, 显示内容)]，按给定顺序排列；有行时在最前面显示标题
+        wanted = {key for key, content in items}
+        for key in [key for key in self._rows if key not in wanted]:
+            row, content = self._rows.pop(key)
+            self.remove_widget(row)
+            self._spare.append(row)
+        for key, content in items:
+            entry = self._rows.get(key)
+            if entry is None:
+                row = self._spare.pop() if self._spare else self.create_row()
+                self.fill_row(row, content)
+                self._rows[key] = (row, content)
+            elif entry[1] != content:
+                self.fill_row(entry[0], content)
+                self._rows[key] = (entry[0], content)
+        ordered = [self.title] + [self._rows[key][0] for key, content in items] if items else []
+        # children与显示顺序相反；已有的行顺序不变时只追加新行，否则按新顺序重新排列
+        current = self.children[::-1]
+        if current != ordered[:len(current)]:
+            self.clear_widgets()
+            current = []
+        for widget in ordered[len(current):]:
+            self.add_widget(widget)
+
+def summary_row_factory(symbol_font_size):
+    def create_row():
+        row = BoxLayout(orientation='vertical', spacing=5, padding=10)
+        row.add_widget(Label(font_size=symbol_font_size, bold=True, font_name='ChineseFont'))
+        row.add_widget(Label(font_name='ChineseFont'))
+        row.add_widget(Label(font_name='ChineseFont'))
+        return row
+    return create_row
+
+def fill_summary_row(row, texts):
+    # 文字相同时Label不会重新渲染纹理
+    for label, text in zip(row.children[::-1], texts):
+        label.text = text
+
+def summary_items(summary):
+    return [(item[0], (f"品种: {item[0]}", f"总交易次数: {item[1]}", f"总盈亏: {item[2]:.2f}")) for item in summary]
+
+def set_label_text(label, text):
+    label.text = text
+
+def set_status(container, status, text):
+    # 状态提示固定显示在容器最上方；text为None时移除
+    if text is None:
+        if status.parent is not None:
+            container.remove_widget(status)
+        return
+    status.text = text
+    if status.parent is None:
+        container.add_widget(status, index=len(container.children))
+
+# 交易列表每次从数据库读取的行数
+TRADE_PAGE_SIZE = 200
+# 距离底部多近时加载下一页（scroll_y从1到0）
+TRADE_LOAD_THRESHOLD = 0.1
+
+def trade_row_data(trade):
+    trade_id, symbol, open_time, close_time, profit_loss = trade
+    return {
+        'title': f"交易 #{trade_id} - {symbol}",
+        'times': f"开仓时间: {open_time} | 平仓时间: {close_time}",
+        'profit_loss': f"盈亏: {profit_loss or 0.0:.2f}",
+    }
+
+# 透视维度的显示名称，'无' 表示不使用第二个维度
+PIVOT_LABELS = {
+    '无': None,
+    '驱动策略': 'drive_strategy',
+    '入场方式': 'entry_mode',
+    '开仓情绪': 'open_emotion',
+    '方向': 'direction',
+    '开仓周期': 'open_cycle',
+    '按日': 'day',
+    '按周': 'week',
+    '按月': 'month',
+}
+# 透视表最多显示的行数，避免按日等细粒度组合时创建过多控件
+PIVOT_MAX_ROWS = 200
+
+# 检索摘要中命中部分的临时标记，转义后替换为高亮标签
+SEARCH_MARKERS = ('\x02', '\x03')
+
+def search_row_data(result):
+    trade_id, symbol, open_time, close_time, profit_loss, snippet = result
+    data = trade_row_data((trade_id, symbol, open_time, close_time, profit_loss))
+    snippet = escape_markup(snippet).replace(SEARCH_MARKERS[0], '[color=ff5555]').replace(SEARCH_MARKERS[1], '[/color]')
+    data['profit_loss'] = f"{escape_markup(data['profit_loss'])}  命中: {snippet}"
+    return data
+
 class AnalysisScreen(Screen):
+    pivot_choices = ListProperty(list(PIVOT_LABELS))
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.data_model = DataModel()
+        self.loader = get_loader()
+        self._last_trade_id = 0
+        self._trades_exhausted = False
+        self._page_loading = False
+        # 交易列表每次重置加一；初始加载返回时列表已被检索重置过，就不再追加第一页
+        self._trade_list_generation = 0
+        # 滚动指标引擎，首次后台加载时创建
+        self.rolling_metrics = None
+        # 状态提示和汇总面板只创建一次，之后按数据差异更新
+        self._status = Label(font_name='ChineseFont')
+        # 最近一次完整显示的透视表 (维度, 结果行)
+        self._pivot_shown = None
+        self._rolling_panel = SummaryPanel(lambda: Label(font_name='ChineseFont'), set_label_text, spacing=10)
+        self._summary_panel = SummaryPanel(
+            summary_row_factory('16sp'), fill_summary_row, title="\n品种汇总", spacing=10
+        )
+        self.ids.analysis_content.add_widget(self._rolling_panel)
+        self.ids.analysis_content.add_widget(self._summary_panel)
     
     def on_enter(self, *args):
-        # 清空现有内容
-        content = self.ids.analysis_content
-        content.clear_widgets()
+        # 重置交易列表，数据在后台加载；已有汇总时保留上次的内容，数据到达后只更新变化的行
+        self._reset_trade_list()
+        self._page_loading = True
+        self.ids.search_input.text = ''
         
-        # 获取所有交易数据
-        trades = self.data_model.get_all_trades()
+        if not self._summary_panel.has_rows():
+            set_status(self.ids.analysis_content, self._status, "加载中...")
         
-        if not trades:
-            content.add_widget(Label(text="暂无交易数据", font_name='ChineseFont'))
+        generation = self._trade_list_generation
+        self.loader.load(self.name, self._load_initial, lambda result: self._show_initial(result, generation))
+        self.update_pivot()
+    
+    def on_leave(self, *args):
+        # 离开界面时丢弃尚未返回的加载结果
+        self.loader.cancel(self.name)
+        self.loader.cancel(self._trades_owner)
+        self.loader.cancel(self._pivot_owner)
+    
+    @property
+    def _trades_owner(self):
+        return f'{self.name}.trades'
+    
+    def _reset_trade_list(self):
+        self._trade_list_generation += 1
+        self._last_trade_id = 0
+        self._trades_exhausted = False
+        self._page_loading = False
+        self.ids.trade_list.data = []
+        self.ids.trade_list.scroll_y = 1
+    
+    def search(self, query):
+        # 有检索词时列表只显示检索结果（不再翻页），清空检索词恢复完整列表
+        self.loader.cancel(self._trades_owner)
+        self._reset_trade_list()
+        query = query.strip()
+        if not query:
+            self.load_next_trade_page()
             return
+        self._trades_exhausted = True
+        self.loader.load(
+            self._trades_owner,
+            lambda: self.data_model.search_trades(query, markers=SEARCH_MARKERS),
+            self._show_search_results
+        )
+    
+    def _show_search_results(self, results):
+        self.ids.trade_list.data = [search_row_data(result) for result in results]
+        if not results:
+            self.ids.trade_list.data = [{'title': '没有匹配的交易', 'times': '', 'profit_loss': ''}]
+    
+    @property
+    def _pivot_owner(self):
+        return f'{self.name}.pivot'
+    
+    def pivot_dimensions(self):
+        dimensions = [PIVOT_LABELS[self.ids.pivot_first.text]]
+        second = PIVOT_LABELS[self.ids.pivot_second.text]
+        if second is not None and second not in dimensions:
+            dimensions.append(second)
+        return dimensions
+    
+    def update_pivot(self):
+        # 切换维度时丢弃上一次未完成的查询；结果按维度和数据版本缓存在DataModel中
+        if self.manager is None or self.manager.current != self.name:
+            return
+        dimensions = self.pivot_dimensions()
+        self.loader.cancel(self._pivot_owner)
+        self.loader.load(
+            self._pivot_owner,
+            lambda: self.data_model.get_pivot(dimensions),
+            lambda rows: self._show_pivot(dimensions, rows)
+        )
+    
+    def _show_pivot(self, dimensions, rows):
+        # 维度和结果都与已完整显示的表格相同时（如数据未变时重新进入界面）不重建单元格
+        if self._pivot_shown == (dimensions, rows):
+            return
+        self._pivot_shown = None
+        table = self.ids.pivot_table
+        table.clear_widgets()
+        table.cols = len(dimensions) + 4
+        labels = {dimension: label for label, dimension in PIVOT_LABELS.items()}
+        header = [labels[dimension] for dimension in dimensions] + ['笔数', '总盈亏', '胜率', '平均盈亏']
+        cells = [(text, True) for text in header]
+        for row in rows[:PIVOT_MAX_ROWS]:
+            keys = row[:len(dimensions)]
+            total_trades, total_pl, wins, losses, win_rate = row[len(dimensions):]
+            cells.extend((text, False) for text in [str(key) for key in keys] + [
+                str(total_trades), f"{total_pl:.2f}", f"{win_rate * 100:.1f}%", f"{total_pl / total_trades:.2f}"
+            ])
+        if len(rows) > PIVOT_MAX_ROWS:
+            cells.append((f"仅显示前{PIVOT_MAX_ROWS}组，共{len(rows)}组", False))
+        def done():
+            self._pivot_shown = (dimensions, rows)
+        self.loader.apply_in_batches(self._pivot_owner, cells, self._add_pivot_cell, batch_size=60, on_done=done)
+    
+    def _add_pivot_cell(self, cell):
+        text, bold = cell
+        self.ids.pivot_table.add_widget(Factory.PivotCell(text=text, bold=bold))
+    
+    def _load_initial(self):
+        # 在后台线程执行；滚动指标模块依赖NumPy，在这里延迟导入
+        rows = self.data_model.get_trades_page(0, TRADE_PAGE_SIZE, columns=LIST_COLUMNS)
+        summary = self.data_model.get_summary_by_symbol()
+        if self.rolling_metrics is None:
+            from rolling_metrics import RollingMetrics
+            self.rolling_metrics = RollingMetrics(self.data_model)
+        rolling = self.rolling_metrics.sync()
+        return rows, summary, rolling
+    
+    def _show_initial(self, result, generation):
+        rows, summary, rolling = result
+        if generation == self._trade_list_generation:
+            self._append_trade_rows(rows)
         
-        # 显示交易记录
-            for trade in trades:
-                trade_box = BoxLayout(orientation='vertical', spacing=5, padding=10)
-                # 确保索引在范围内
-                trade_id = trade[0] if len(trade) > 0 else 'N/A'
-                symbol = trade[1] if len(trade) > 1 else 'N/A'
-                open_time = trade[3] if len(trade) > 3 else 'N/A'
-                close_time = trade[20] if len(trade) > 20 else 'N/A'
-                profit_loss = trade[24] if len(trade) > 24 else 0.0
-                
-                trade_box.add_widget(Label(text=f"交易 #{trade_id} - {symbol}", font_size='16sp', bold=True, font_name='ChineseFont'))
-                trade_box.add_widget(Label(text=f"开仓时间: {open_time} | 平仓时间: {close_time}", font_name='ChineseFont'))
-                trade_box.add_widget(Label(text=f"盈亏: {profit_loss:.2f}", font_name='ChineseFont'))
-                content.add_widget(trade_box)
+        if not rows:
+            self._rolling_panel.update([])
+            self._summary_panel.update([])
+            set_status(self.ids.analysis_content, self._status, "暂无交易数据")
+            return
         
+        set_status(self.ids.analysis_content, self._status, None)
+        self._show_rolling(rolling)
         # 按品种汇总
-        summary = self.data_model.get_summary_by_symbol()
-        if summary:
-            content.add_widget(Label(text="\n品种汇总", font_size='18sp', bold=True, font_name='ChineseFont'))
-            for item in summary:
-                summary_box = BoxLayout(orientation='vertical', spacing=5, padding=10)
-                summary_box.add_widget(Label(text=f"品种: {item[0]}", font_size='16sp', bold=True, font_name='ChineseFont'))
-                summary_box.add_widget(Label(text=f"总交易次数: {item[1]}", font_name='ChineseFont'))
-                summary_box.add_widget(Label(text=f"总盈亏: {item[2]:.2f}", font_name='ChineseFont'))
-                content.add_widget(summary_box)
+        self._summary_panel.update(summary_items(summary))
+    
+    def _show_rolling(self, rolling):
+        # 整体在前，其余按品种
+        self._rolling_panel.title.text = f"\n近{self.rolling_metrics.window}笔滚动指标"
+        items = []
+        for scope in sorted(rolling, key=lambda scope: (scope != '*', scope)):
+            metrics = rolling[scope]
+            profit_factor = metrics['profit_factor']
+            items.append((
+                scope,
+                f"{'全部' if scope == '*' else scope}: 胜率 {metrics['win_rate'] * 100:.1f}% | "
+                f"平均盈亏 {metrics['average_profit_loss']:.2f} | "
+                f"盈亏比 {'∞' if profit_factor == float('inf') else f'{profit_factor:.2f}'} | "
+                f"回撤 {metrics['drawdown']:.2f}"
+            ))
+        self._rolling_panel.update(items)
+    
+    def load_next_trade_page(self):
+        if self._trades_exhausted or self._page_loading:
+            return
+        self._page_loading = True
+        after_id = self._last_trade_id
+        self.loader.load(
+            self._trades_owner,
+            lambda: self.data_model.get_trades_page(after_id, TRADE_PAGE_SIZE, columns=LIST_COLUMNS),
+            self._append_trade_rows
+        )
+    
+    def _append_trade_rows(self, rows):
+        self._page_loading = False
+        if len(rows) < TRADE_PAGE_SIZE:
+            self._trades_exhausted = True
+        if rows:
+            self._last_trade_id = rows[-1][0]
+            self.ids.trade_list.data.extend(trade_row_data(row) for row in rows)
+    
+    def on_trade_list_scroll(self, trade_list):
+        if trade_list.scroll_y <= TRADE_LOAD_THRESHOLD:
+            self.load_next_trade_page()
+
+# 图表类型与对应的Image控件id
+CHART_WIDGETS = {
+    'profit_loss': 'profit_loss_chart',
+    'win_rate': 'win_rate_chart',
+}
 
 class ChartsScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.data_model = DataModel()
+        self.chart_renderer = ChartRenderer(font_path=font_path)
+        self.loader = get_loader()
+        # 每种图表最近一次上传的纹理：{kind: (key, texture)}
+        self._chart_textures = {}
+        self._wanted_charts = {}
+        self._status = Label(font_name='ChineseFont')
+        self._summary_panel = SummaryPanel(
+            summary_row_factory('14sp'), fill_summary_row, title="\n品种汇总", title_font_size='16sp', spacing=20
+        )
+        self.ids.charts_content.add_widget(self._summary_panel)
     
     def on_enter(self, *args):
-        # 清空现有内容
-        content = self.ids.charts_content
-        content.clear_widgets()
-        
-        # 获取汇总数据
-        summary = self.data_model.get_summary_by_symbol()
-        
+        # 汇总数据在后台读取；首次进入先显示占位提示，之后保留上次的汇总直到新数据到达
+        if not self._summary_panel.has_rows():
+            set_status(self.ids.charts_content, self._status, "加载中...")
+        self.loader.load(self.name, self.data_model.get_summary_by_symbol, self._show_summary)
+    
+    def on_leave(self, *args):
+        self.loader.cancel(self.name)
+    
+    def _show_summary(self, summary):
         if not summary:
-            content.add_widget(Label(text="暂无交易数据", font_name='ChineseFont'))
+            for widget_id in CHART_WIDGETS.values():
+                self.ids[widget_id].texture = None
+            self._summary_panel.update([])
+            set_status(self.ids.charts_content, self._status, "暂无交易数据")
             return
         
-        # 显示简单的文本汇总
-        content.add_widget(Label(text="\n品种汇总", font_size='16sp', bold=True, font_name='ChineseFont'))
-        for item in summary:
-            summary_box = BoxLayout(orientation='vertical', spacing=5, padding=10)
-            summary_box.add_widget(Label(text=f"品种: {item[0]}", font_size='14sp', bold=True, font_name='ChineseFont'))
-            summary_box.add_widget(Label(text=f"总交易次数: {item[1]}", font_name='ChineseFont'))
-            summary_box.add_widget(Label(text=f"总盈亏: {item[2]:.2f}", font_name='ChineseFont'))
-            content.add_widget(summary_box)
+        set_status(self.ids.charts_content, self._status, None)
+        self.update_charts(summary)
+        # 显示简单的文本汇总，只更新变化的品种
+        self._summary_panel.update(summary_items(summary))
+    
+    def update_charts(self, summary):
+        version = summary_version(summary)
+        for kind, widget_id in CHART_WIDGETS.items():
+            key = self.chart_renderer.chart_key(kind, version)
+            self._wanted_charts[kind] = key
+            cached = self._chart_textures.get(kind)
+            if cached and cached[0] == key:
+                # 数据没变，直接复用已上传的纹理
+                self.ids[widget_id].texture = cached[1]
+                continue
+            self.chart_renderer.render_async(kind, summary, self._on_chart_rendered(kind))
+    
+    def _on_chart_rendered(self, kind):
+        def callback(key, png):
+            # 工作线程回调，切回UI线程上传纹理
+            Clock.schedule_once(lambda dt: self._show_chart(kind, key, png))
+        return callback
+    
+    def _show_chart(self, kind, key, png):
+        if self._wanted_charts.get(kind) != key:
+            return
+        texture = CoreImage(io.BytesIO(png), ext='png').texture
+        self._chart_textures[kind] = (key, texture)
+        self.ids[CHART_WIDGETS[kind]].texture = texture
+
+class LazyScreenManager(ScreenManager):
+    # 界面在第一次切换到时才编译KV规则并创建
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._factories = {}
+    
+    def register(self, name, factory):
+        self._factories[name] = factory
+    
+    def has_screen(self, name):
+        return name in self._factories or super().has_screen(name)
+    
+    def get_screen(self, name):
+        factory = self._factories.pop(name, None)
+        if factory is not None:
+            load_kv(name)
+            self.add_widget(factory())
+        return super().get_screen(name)
+
+def write_startup_report(timings):
+    # 追加本次启动耗时，并与上一次记录对比，便于发现回退
+    previous = None
+    try:
+        with open(STARTUP_REPORT_FILE, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        if lines:
+            previous = json.loads(lines[-1])
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(STARTUP_REPORT_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(timings) + '\n')
+    except OSError:
+        pass
+    message = f"启动耗时: 首帧 {timings['first_frame']:.3f}s (导入 {timings['imports']:.3f}s, build {timings['build']:.3f}s)"
+    if previous and 'first_frame' in previous:
+        message += f"，上次 {previous['first_frame']:.3f}s"
+    print(message)
 
 class FuturesReviewApp(App):
     def build(self):
-        sm = ScreenManager()
+        build_start = time.perf_counter()
+        self._timings = {'imports': build_start - _STARTUP_T0}
+        load_kv('main')
+        sm = LazyScreenManager()
         sm.add_widget(MainScreen())
-        sm.add_widget(InputScreen())
-        sm.add_widget(AnalysisScreen())
-        sm.add_widget(ChartsScreen())
+        sm.register('input', lambda: InputScreen())
+        sm.register('analysis', lambda: AnalysisScreen())
+        sm.register('charts', lambda: ChartsScreen())
+        self._timings['build'] = time.perf_counter() - build_start
         return sm
+    
+    def on_start(self):
+        # 设置了 FUTURES_REVIEW_PROFILE 时记录每条查询的耗时和执行计划
+        query_profiler.enable_from_env(DEFAULT_DB_PATH)
+        # 设置了 FUTURES_REVIEW_PERF（或存在 perf_overlay.flag）时记录帧时间和界面进入耗时
+        perf_overlay.start_from_env(self.root)
+        # 第一帧绘制完成后记录启动耗时
+        Window.bind(on_flip=self._on_first_frame)
+        # 数据库结构需要升级时在后台分批迁移，期间显示进度；结构已是最新时只读一次 user_version
+        manager = get_manager(DEFAULT_DB_PATH)
+        if pending_migrations(manager):
+            self._open_migration_popup()
+            get_loader().load(
+                'migrations',
+                lambda: manager.initialize(lambda m: migrate(m, self._on_migration_progress)),
+                self._on_migrated,
+                self._on_migration_failed
+            )
+        else:
+            self._start_trade_writer()
+    
+    def _start_trade_writer(self):
+        # 在后台启动写入队列，重放上次崩溃前已确认但未提交的交易
+        get_loader().load('trade_writer', lambda: get_trade_writer(DataModel()), lambda writer: None)
+    
+    def _open_migration_popup(self):
+        content = BoxLayout(orientation='vertical', padding=10, spacing=10)
+        self._migration_label = Label(text="正在升级数据库...", font_name='ChineseFont')
+        self._migration_bar = ProgressBar(max=1)
+        content.add_widget(self._migration_label)
+        content.add_widget(self._migration_bar)
+        self._migration_popup = Popup(title="数据库升级", content=content, size_hint=(0.8, 0.4), auto_dismiss=False)
+        self._migration_popup.open()
+    
+    def _on_migration_progress(self, migration, done, total):
+        # 在迁移线程中调用，切回UI线程更新进度
+        def update(dt):
+            self._migration_label.text = f"({migration.version}/{LATEST_VERSION}) {migration.description}: {done}/{total}"
+            self._migration_bar.value = (migration.version - 1 + (done / total if total else 1)) / LATEST_VERSION
+        Clock.schedule_once(update)
+    
+    def _on_migrated(self, result):
+        self._migration_popup.dismiss()
+        self._start_trade_writer()
+    
+    def _on_migration_failed(self, error):
+        # 迁移可以续跑，下次启动从中断处继续
+        self._migration_label.text = f"数据库升级失败，请重启应用重试: {error}"
+    
+    def _on_first_frame(self, *args):
+        Window.unbind(on_flip=self._on_first_frame)
+        self._timings['first_frame'] = time.perf_counter() - _STARTUP_T0
+        self._timings['time'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        write_startup_report(self._timings)
+    
+    def on_pause(self):
+        # Android切到后台后进程可能被系统回收，先把写入队列中的交易提交
+        flush_all_writers()
+        perf_overlay.dump()
+        return True
+    
+    def on_stop(self):
+        # 退出时写完队列中的交易，停止后台加载并关闭共享的数据库连接
+        close_all_writers()
+        perf_overlay.dump()
+        perf_overlay.stop()
+        get_loader().shutdown()
+        query_profiler.disable()
+        close_all()
 
 if __name__ == "__main__":
     FuturesReviewApp().run()
\ No newline at end of file
@@ -0,0 +1,314 @@
+import sqlite3
+from contextlib import contextmanager
+
+import data_model
+
+# 按 PRAGMA user_version 编号的结构迁移。逐行改写数据的迁移分批执行，每批一个事务，
+# 进程中途被杀掉后从数据库现状继续；迁移全部完成后才写入新的 user_version。
+# sqlite3模块默认不为DDL开启事务（每条CREATE/DROP/ALTER单独提交），迁移的每一步都在显式的 BEGIN…COMMIT 中执行
+MIGRATION_BATCH_SIZE = 2000
+
+# 最初版本的交易表（文本字段直接存放在trades中）
+_LEGACY_TRADES_TABLE_SQL = '''
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            symbol TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            open_time TEXT NOT NULL,
+            open_cycle INTEGER NOT NULL,
+            open_boundary_ma TEXT NOT NULL,
+            target_boundary_ma TEXT NOT NULL,
+            drive_strategy TEXT NOT NULL,
+            entry_mode TEXT NOT NULL,
+            entry_signal TEXT NOT NULL,
+            stop_loss_rule TEXT NOT NULL,
+            take_profit_rule TEXT NOT NULL,
+            open_emotion TEXT NOT NULL,
+            open_price REAL NOT NULL,
+            drawdown REAL NOT NULL,
+            add_price REAL NOT NULL,
+            add_price1 REAL NOT NULL,
+            reduce_price REAL NOT NULL,
+            reduce_price1 REAL NOT NULL,
+            close_cycle INTEGER NOT NULL,
+            close_time TEXT NOT NULL,
+            close_boundary_ma TEXT NOT NULL,
+            exit_signal TEXT NOT NULL,
+            close_emotion TEXT NOT NULL,
+            close_price REAL NOT NULL,
+            profit_loss REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )'''
+
+
+class Migration:
+    # apply(conn): 一个事务内完成的幂等结构变更
+    # batch(conn, cursor, limit) -> (新游标, 处理行数): 分批改写数据，处理行数为0表示完成
+    # start(conn) -> 游标: 从数据库现状推算续跑位置；remaining(conn, cursor) -> 剩余行数，用于报告进度
+    # finish(conn): 收尾，与新的 user_version 在同一事务提交
+    def __init__(self, version, description, apply=None, batch=None, start=None, remaining=None, finish=None):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.batch = batch
+        self.start = start
+        self.remaining = remaining
+        self.finish = finish
+
+
+def _table_columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def _table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+# 1: 最初的交易表
+def _create_trades(conn):
+    conn.execute(_LEGACY_TRADES_TABLE_SQL)
+
+
+# 2: 开平仓时间戳列，从时间文本回填
+def _add_timestamp_columns(conn):
+    existing = _table_columns(conn, 'trades')
+    for name, sql_type in data_model.TIMESTAMP_COLUMNS:
+        if name not in existing:
+            conn.execute(f'ALTER TABLE trades ADD COLUMN {name} {sql_type}')
+
+
+_MISSING_TIMESTAMPS = 'open_ts IS NULL AND close_ts IS NULL'
+
+
+def _backfill_timestamps(conn, cursor, limit):
+    # 已回填的行跳过；无法解析的时间仍为NULL，靠游标避免重复处理
+    rows = conn.execute(
+        f'SELECT id, open_time, close_time FROM trades WHERE id > ? AND {_MISSING_TIMESTAMPS} ORDER BY id LIMIT ?',
+        (cursor, limit)
+    ).fetchall()
+    if not rows:
+        return cursor, 0
+    conn.executemany(
+        'UPDATE trades SET open_ts = ?, close_ts = ?, holding_seconds = ? WHERE id = ?',
+        [data_model._timestamps(open_time, close_time) + (trade_id,) for trade_id, open_time, close_time in rows]
+    )
+    return rows[-1][0], len(rows)
+
+
+def _missing_timestamps(conn, cursor):
+    return conn.execute(f'SELECT COUNT(*) FROM trades WHERE id > ? AND {_MISSING_TIMESTAMPS}', (cursor,)).fetchone()[0]
+
+
+# 3: 重复文本字段字典编码：逐批复制到新表，最后替换旧表
+def _is_legacy_layout(conn):
+    return 'direction' in _table_columns(conn, 'trades')
+
+
+def _prepare_encoding(conn):
+    conn.execute(data_model._TEXT_VALUES_TABLE_SQL)
+    if _is_legacy_layout(conn):
+        conn.execute(data_model._TRADES_TABLE_SQL.replace('EXISTS trades', 'EXISTS trades_encoded'))
+
+
+def _encoding_cursor(conn):
+    # 续跑位置就是新表中已复制的最大id
+    if not _table_exists(conn, 'trades_encoded'):
+        return 0
+    return conn.execute('SELECT COALESCE(MAX(id), 0) FROM trades_encoded').fetchone()[0]
+
+
+def _copy_encoded(conn, cursor, limit):
+    if not _is_legacy_layout(conn):
+        return cursor, 0
+    last_id = conn.execute(
+        'SELECT MAX(id) FROM (SELECT id FROM trades WHERE id > ? ORDER BY id LIMIT ?)', (cursor, limit)
+    ).fetchone()[0]
+    if last_id is None:
+        return cursor, 0
+    for field in data_model.ENCODED_FIELDS:
+        conn.execute(
+            f'INSERT OR IGNORE INTO text_values (value) SELECT DISTINCT {field} FROM trades WHERE id > ? AND id <= ?',
+            (cursor, last_id)
+        )
+    # 旧表在这些列之后没有更多列；之后新增的列（如quantity）在新表中取默认值
+    tail = ['profit_loss', 'created_at', 'open_ts', 'close_ts', 'holding_seconds']
+    stored = ['id'] + [data_model.stored_column(field) for field in data_model.TRADE_FIELDS] + tail
+    selected = ['t.id'] + [
+        f'(SELECT id FROM text_values WHERE value = t.{field})' if field in data_model.ENCODED_FIELDS else f't.{field}'
+        for field in data_model.TRADE_FIELDS
+    ] + [f't.{column}' for column in tail]
+    copied = conn.execute(f'''
+        INSERT INTO trades_encoded ({', '.join(stored)})
+        SELECT {', '.join(selected)} FROM trades t WHERE t.id > ? AND t.id <= ? ORDER BY t.id
+        ''', (cursor, last_id)).rowcount
+    return last_id, copied
+
+
+def _remaining_legacy_rows(conn, cursor):
+    if not _is_legacy_layout(conn):
+        return 0
+    return conn.execute('SELECT COUNT(*) FROM trades WHERE id > ?', (cursor,)).fetchone()[0]
+
+
+def _swap_encoded_table(conn):
+    # 旧表的触发器和索引随旧表删除，由后续迁移重新创建
+    if not _is_legacy_layout(conn):
+        return
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'trades'").fetchone()
+    conn.execute('DROP VIEW IF EXISTS trade_records')
+    conn.execute('DROP TABLE trades')
+    conn.execute('ALTER TABLE trades_encoded RENAME TO trades')
+    # 保留自增序列，已删除交易的id不会被复用
+    if sequence:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'trades'", (sequence[0],))
+
+
+# 4: 查询索引
+def _create_indexes(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_trades_symbol_open_ts ON trades (symbol, open_ts)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_trades_close_ts ON trades (close_ts)')
+    conn.execute(data_model._PIVOT_INDEX_SQL)
+
+
+# 5: 品种汇总表；首次创建时从现有交易重建
+def _create_symbol_summary(conn):
+    has_summary = _table_exists(conn, 'symbol_summary')
+    conn.execute(data_model._SUMMARY_TABLE_SQL)
+    for trigger_sql in data_model._SUMMARY_TRIGGERS:
+        conn.execute(trigger_sql)
+    if not has_summary:
+        data_model.rebuild_summary_table(conn)
+
+
+# 6: 周期盈亏预聚合表；首次创建时从现有交易重建
+def _create_pl_rollup(conn):
+    has_rollup = _table_exists(conn, 'pl_rollup')
+    conn.execute(data_model._ROLLUP_TABLE_SQL)
+    for trigger_sql in data_model._ROLLUP_TRIGGERS:
+        conn.execute(trigger_sql)
+    if not has_rollup:
+        data_model.rebuild_rollup_table(conn)
+
+
+# 7: 元数据表和历史修订号
+def _create_trade_meta(conn):
+    conn.execute(data_model._META_TABLE_SQL)
+    conn.execute("INSERT OR IGNORE INTO trade_meta (key, value) VALUES ('history_revision', 0)")
+    for trigger_sql in data_model._REVISION_TRIGGERS:
+        conn.execute(trigger_sql)
+
+
+# 8: 还原文本列的只读视图
+def _create_trade_records_view(conn):
+    existing = _table_columns(conn, 'trades')
+    columns = [column for column in data_model.TRADE_COLUMNS if data_model.stored_column(column) in existing]
+    conn.execute(data_model.trade_records_view_sql(columns))
+
+
+# 9: 全文检索索引。部分平台自带的SQLite没有FTS5或trigram分词，此时跳过，检索退化为LIKE
+def _create_search_index(conn):
+    has_search = _table_exists(conn, 'trade_search')
+    try:
+        conn.execute(data_model._SEARCH_TABLE_SQL)
+    except sqlite3.OperationalError:
+        return
+    for trigger_sql in data_model._SEARCH_TRIGGERS:
+        conn.execute(trigger_sql)
+    if not has_search:
+        conn.execute("INSERT INTO trade_search (trade_search) VALUES ('rebuild')")
+
+
+# 10: 手数列和合约规格表。默认规格沿用legacy模型，已有盈亏不变；视图重建以带上新列
+def _add_quantity_and_specs(conn):
+    if 'quantity' not in _table_columns(conn, 'trades'):
+        conn.execute(f'ALTER TABLE trades ADD COLUMN quantity REAL NOT NULL DEFAULT {data_model.DEFAULT_QUANTITY}')
+    # 汇总触发器移除最好/最差交易时要重新求该品种的极值；批量重算会频繁遇到，用索引代替整段扫描
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_trades_symbol_profit_loss ON trades (symbol, profit_loss)')
+    conn.execute(data_model._CONTRACT_SPECS_TABLE_SQL)
+    conn.execute(
+        "INSERT OR IGNORE INTO contract_specs (symbol, model) VALUES (?, 'legacy')", (data_model.DEFAULT_SYMBOL,)
+    )
+    conn.execute('DROP VIEW IF EXISTS trade_records')
+    conn.execute(data_model._TRADE_RECORDS_VIEW_SQL)
+
+
+MIGRATIONS = [
+    Migration(1, '创建交易表', apply=_create_trades),
+    Migration(2, '回填开平仓时间戳', apply=_add_timestamp_columns,
+              batch=_backfill_timestamps, remaining=_missing_timestamps),
+    Migration(3, '文本字段字典编码', apply=_prepare_encoding, batch=_copy_encoded,
+              start=_encoding_cursor, remaining=_remaining_legacy_rows, finish=_swap_encoded_table),
+    Migration(4, '创建查询索引', apply=_create_indexes),
+    Migration(5, '品种汇总表', apply=_create_symbol_summary),
+    Migration(6, '周期盈亏预聚合表', apply=_create_pl_rollup),
+    Migration(7, '元数据表', apply=_create_trade_meta),
+    Migration(8, '交易记录视图', apply=_create_trade_records_view),
+    Migration(9, '全文检索索引', apply=_create_search_index),
+    Migration(10, '手数与合约规格', apply=_add_quantity_and_specs),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(manager):
+    return manager.reader().execute('PRAGMA user_version').fetchone()[0]
+
+
+def pending_migrations(manager):
+    version = current_version(manager)
+    return [migration for migration in MIGRATIONS if migration.version > version]
+
+
+def migrate(manager, progress=None, batch_size=MIGRATION_BATCH_SIZE):
+    # progress(migration, done, total) 在执行迁移的线程中调用
+    for migration in pending_migrations(manager):
+        _run_migration(manager, migration, progress, batch_size)
+
+
+@contextmanager
+def _transaction(manager):
+    # 写连接临时切换为手动事务模式，块内的DDL和DML要么全部提交，要么全部回滚
+    with manager.writer() as conn:
+        isolation_level = conn.isolation_level
+        conn.isolation_level = None
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.execute('COMMIT')
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.isolation_level = isolation_level
+
+
+def _run_migration(manager, migration, progress, batch_size):
+    if migration.batch is not None:
+        if migration.apply is not None:
+            with _transaction(manager) as conn:
+                migration.apply(conn)
+        with manager.writer() as conn:
+            cursor = migration.start(conn) if migration.start is not None else 0
+            total = migration.remaining(conn, cursor) if migration.remaining is not None else 0
+        done = 0
+        if progress is not None:
+            progress(migration, done, total)
+        while True:
+            # 每批单独提交，批与批之间其他连接可以读写
+            with _transaction(manager) as conn:
+                cursor, processed = migration.batch(conn, cursor, batch_size)
+            if not processed:
+                break
+            done += processed
+            if progress is not None:
+                progress(migration, done, max(total, done))
+    with _transaction(manager) as conn:
+        # 没有分批步骤的迁移，结构变更与新的 user_version 在同一事务提交
+        if migration.batch is None and migration.apply is not None:
+            migration.apply(conn)
+        if migration.finish is not None:
+            migration.finish(conn)
+        conn.execute(f'PRAGMA user_version = {migration.version}')
+    if progress is not None and migration.batch is None:
+        progress(migration, 1, 1)
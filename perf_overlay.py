@@ -0,0 +1,232 @@
+import json
+import os
+import time
+from collections import deque
+
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.uix.label import Label
+
+# 界面性能记录默认关闭。设置环境变量 FUTURES_REVIEW_PERF=1，或在应用工作目录放一个 perf_overlay.flag 文件
+# （Android上无法设置环境变量时用 adb 推送）即可开启；值为 record 时只记录不显示浮层
+PERF_ENV = 'FUTURES_REVIEW_PERF'
+PERF_FLAG_FILE = 'perf_overlay.flag'
+# 每次暂停/退出时追加一行JSON
+PERF_REPORT_FILE = 'perf_report.jsonl'
+# 保留的最近帧数（60fps约10分钟），百分位数在这些帧上计算
+MAX_FRAME_SAMPLES = 36000
+# 浮层刷新间隔（秒）和统计的最近帧数
+OVERLAY_INTERVAL = 0.5
+OVERLAY_FRAMES = 120
+
+
+def percentiles(samples):
+    # 最近秩法的 p50/p95/max（毫秒）
+    if not samples:
+        return {'count': 0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+    ordered = sorted(samples)
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))] * 1000
+    return {'count': len(ordered), 'p50_ms': rank(0.5), 'p95_ms': rank(0.95), 'max_ms': ordered[-1] * 1000}
+
+
+def count_widgets(widget):
+    return sum(1 for _ in widget.walk(restrict=True))
+
+
+class PerfRecorder:
+    # 用Clock每帧回调记录帧间隔（按当前界面分别统计），并包装各界面的on_enter记录耗时和控件数
+    def __init__(self, report_path=PERF_REPORT_FILE, max_frames=MAX_FRAME_SAMPLES):
+        self.report_path = report_path
+        self.frames = deque(maxlen=max_frames)
+        self.screen_frames = {}
+        # {界面名: {'on_enter': [耗时秒], 'widgets': 进入完成时的控件数, 'widgets_on_leave': 离开时的控件数}}
+        self.screens = {}
+        self.started = time.strftime('%Y-%m-%d %H:%M:%S')
+        self._manager = None
+        self._frame_event = None
+        # {界面: (原on_enter, 原on_leave)}，stop()时还原
+        self._originals = {}
+
+    def start(self, screen_manager):
+        self._manager = screen_manager
+        screen_manager.bind(screens=self._on_screens)
+        self._instrument_all(screen_manager.screens)
+        self._frame_event = Clock.schedule_interval(self._on_frame, 0)
+
+    def stop(self):
+        # 停止后不再包装新界面，已包装的界面还原处理函数，重新start()时不会套两层计时
+        if self._frame_event is not None:
+            self._frame_event.cancel()
+            self._frame_event = None
+        if self._manager is not None:
+            self._manager.unbind(screens=self._on_screens)
+        for screen, (on_enter, on_leave) in self._originals.items():
+            screen.on_enter = on_enter
+            screen.on_leave = on_leave
+        self._originals = {}
+
+    def _on_screens(self, manager, screens):
+        self._instrument_all(screens)
+
+    def _on_frame(self, dt):
+        self.frames.append(dt)
+        current = self._manager.current if self._manager is not None else None
+        if current:
+            frames = self.screen_frames.get(current)
+            if frames is None:
+                frames = self.screen_frames[current] = deque(maxlen=self.frames.maxlen)
+            frames.append(dt)
+
+    def _instrument_all(self, screens):
+        for screen in screens:
+            if screen.name not in self.screens:
+                self._instrument(screen)
+
+    def _instrument(self, screen):
+        # 替换实例上的on_enter/on_leave，Kivy派发事件时按属性查找处理函数
+        stats = self.screens[screen.name] = {'on_enter': [], 'widgets': 0, 'widgets_on_leave': 0}
+        on_enter = screen.on_enter
+        on_leave = screen.on_leave
+        self._originals[screen] = (on_enter, on_leave)
+
+        def timed_on_enter(*args):
+            start = time.perf_counter()
+            try:
+                return on_enter(*args)
+            finally:
+                stats['on_enter'].append(time.perf_counter() - start)
+                stats['widgets'] = count_widgets(screen)
+
+        def counted_on_leave(*args):
+            # 后台加载的内容在进入后才添加，离开时的控件数更能反映界面规模
+            stats['widgets_on_leave'] = count_widgets(screen)
+            return on_leave(*args)
+
+        screen.on_enter = timed_on_enter
+        screen.on_leave = counted_on_leave
+
+    def summary(self):
+        return {
+            'started': self.started,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'frames': percentiles(self.frames),
+            'screens': {
+                name: {
+                    'enters': len(stats['on_enter']),
+                    'on_enter': percentiles(stats['on_enter']),
+                    'frames': percentiles(self.screen_frames.get(name, ())),
+                    'widgets': stats['widgets'],
+                    'widgets_on_leave': stats['widgets_on_leave'],
+                }
+                for name, stats in self.screens.items()
+            },
+        }
+
+    def dump(self):
+        summary = self.summary()
+        try:
+            with open(self.report_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+        except OSError:
+            pass
+        return summary
+
+
+class PerfOverlay(Label):
+    # 窗口左上角的半透明统计文字：最近帧的fps和p50/p95/max、当前界面及其控件数、上次on_enter耗时
+    def __init__(self, recorder, **kwargs):
+        kwargs.setdefault('font_size', '11sp')
+        kwargs.setdefault('color', (1, 1, 0, 0.85))
+        kwargs.setdefault('size_hint', (None, None))
+        kwargs.setdefault('halign', 'left')
+        kwargs.setdefault('valign', 'top')
+        super().__init__(**kwargs)
+        self.recorder = recorder
+        self.bind(texture_size=self._resize)
+        Window.bind(size=self._on_window_size)
+        self._event = Clock.schedule_interval(self.refresh, OVERLAY_INTERVAL)
+
+    def _resize(self, *args):
+        self.size = self.texture_size
+        self._place()
+
+    def _on_window_size(self, *args):
+        self._place()
+
+    def _place(self):
+        self.pos = (0, Window.height - self.height)
+
+    def refresh(self, dt=None):
+        recent = list(self.recorder.frames)[-OVERLAY_FRAMES:]
+        stats = percentiles(recent)
+        fps = len(recent) / sum(recent) if recent and sum(recent) > 0 else 0.0
+        lines = [f"{fps:.0f} fps  p50 {stats['p50_ms']:.1f}  p95 {stats['p95_ms']:.1f}  max {stats['max_ms']:.1f} ms"]
+        manager = self.recorder._manager
+        if manager is not None and manager.current:
+            screen = manager.current_screen
+            line = f"{manager.current}: {count_widgets(screen)} widgets"
+            entered = self.recorder.screens.get(manager.current, {}).get('on_enter')
+            if entered:
+                line += f", on_enter {entered[-1] * 1000:.1f} ms"
+            lines.append(line)
+        self.text = '\n'.join(lines)
+
+    def remove(self):
+        self._event.cancel()
+        Window.unbind(size=self._on_window_size)
+        Window.remove_widget(self)
+
+
+_recorder = None
+_overlay = None
+
+
+def get_recorder():
+    return _recorder
+
+
+def enabled_mode():
+    # 返回 None（关闭）、'record'（只记录）或 'overlay'（记录并显示浮层）
+    value = os.environ.get(PERF_ENV)
+    if not value and os.path.exists(PERF_FLAG_FILE):
+        try:
+            with open(PERF_FLAG_FILE, encoding='utf-8') as f:
+                value = f.read().strip() or '1'
+        except OSError:
+            value = '1'
+    if not value or value == '0':
+        return None
+    return 'record' if value == 'record' else 'overlay'
+
+
+def start(screen_manager, overlay=True, report_path=PERF_REPORT_FILE):
+    global _recorder, _overlay
+    stop()
+    _recorder = PerfRecorder(report_path)
+    _recorder.start(screen_manager)
+    if overlay:
+        _overlay = PerfOverlay(_recorder)
+        Window.add_widget(_overlay)
+    return _recorder
+
+
+def start_from_env(screen_manager):
+    mode = enabled_mode()
+    if mode is None:
+        return None
+    return start(screen_manager, overlay=mode == 'overlay')
+
+
+def dump():
+    return _recorder.dump() if _recorder is not None else None
+
+
+def stop():
+    global _recorder, _overlay
+    if _overlay is not None:
+        _overlay.remove()
+        _overlay = None
+    if _recorder is not None:
+        _recorder.stop()
+        _recorder = None
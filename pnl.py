@@ -0,0 +1,96 @@
+# 盈亏计算模型。每个品种按合约规格（contract_specs表）选择模型，'*' 为未单独配置品种的默认规格
+
+DEFAULT_SYMBOL = '*'
+# 方向符号：做空时价格下跌为盈利；无法识别的方向按做多处理
+DIRECTION_SIGNS = {'多': 1, '空': -1}
+# 每笔交易最多三次开仓/加仓和三次减仓/平仓，价格为0表示没有这次成交
+ENTRY_PRICE_FIELDS = ['open_price', 'add_price', 'add_price1']
+EXIT_PRICE_FIELDS = ['reduce_price', 'reduce_price1', 'close_price']
+PRICE_FIELDS = ENTRY_PRICE_FIELDS + EXIT_PRICE_FIELDS
+SPEC_COLUMNS = ['symbol', 'model', 'multiplier', 'commission', 'slippage']
+
+
+class ContractSpec:
+    # multiplier: 合约乘数；commission: 每手每次成交的手续费；slippage: 每次成交的滑点（价格单位）
+    def __init__(self, symbol=DEFAULT_SYMBOL, model='legacy', multiplier=1.0, commission=0.0, slippage=0.0):
+        self.symbol = symbol
+        self.model = model
+        self.multiplier = multiplier
+        self.commission = commission
+        self.slippage = slippage
+
+    def as_row(self):
+        return (self.symbol, self.model, self.multiplier, self.commission, self.slippage)
+
+    def __eq__(self, other):
+        return isinstance(other, ContractSpec) and self.as_row() == other.as_row()
+
+    def __repr__(self):
+        return f"ContractSpec{self.as_row()!r}"
+
+
+def round_prices(prices):
+    # 价格保留两位小数。np.round先乘100再取整，与round()在 x.xx5 附近结果不同；
+    # 这里对去重后的价格逐个用round()，再按索引展开，保证与逐笔计算一致
+    import numpy as np
+    values = np.concatenate([np.asarray(prices[field], dtype=np.float64) for field in PRICE_FIELDS])
+    unique, inverse = np.unique(values, return_inverse=True)
+    rounded = np.array([round(value, 2) for value in unique.tolist()], dtype=np.float64)[inverse]
+    return dict(zip(PRICE_FIELDS, np.split(rounded, len(PRICE_FIELDS))))
+
+
+class LegacyModel:
+    # 最初的算法：减仓、平仓价格之和减开仓、加仓价格之和，不区分方向和手数
+    name = 'legacy'
+
+    def profit_loss(self, trade, spec):
+        return self._formula(trade, round)
+
+    def profit_loss_array(self, prices, signs, quantity, spec):
+        return self._formula(round_prices(prices), lambda value, digits: value)
+
+    def _formula(self, p, rnd):
+        # 与历史数据相同的求值顺序，保证重算结果逐位一致
+        return rnd(p['reduce_price'], 2) + rnd(p['reduce_price1'], 2) + rnd(p['close_price'], 2) - \
+            rnd(p['open_price'], 2) - rnd(p['add_price'], 2) - rnd(p['add_price1'], 2)
+
+
+class ContractModel:
+    # 按方向、手数、合约乘数计算毛盈亏，再扣除每次成交的手续费和滑点
+    name = 'contract'
+
+    def profit_loss(self, trade, spec):
+        sign = DIRECTION_SIGNS.get(trade['direction'], 1)
+        quantity = trade.get('quantity', 1)
+        entries = [round(trade[field], 2) for field in ENTRY_PRICE_FIELDS]
+        exits = [round(trade[field], 2) for field in EXIT_PRICE_FIELDS]
+        fills = sum(1 for price in entries + exits if price != 0)
+        gross = sign * (sum(exits) - sum(entries)) * spec.multiplier * quantity
+        return gross - fills * quantity * (spec.commission + spec.slippage * spec.multiplier)
+
+    def profit_loss_array(self, prices, signs, quantity, spec):
+        prices = round_prices(prices)
+        entries = sum(prices[field] for field in ENTRY_PRICE_FIELDS)
+        exits = sum(prices[field] for field in EXIT_PRICE_FIELDS)
+        fills = sum((prices[field] != 0).astype('int64') for field in PRICE_FIELDS)
+        gross = signs * (exits - entries) * spec.multiplier * quantity
+        return gross - fills * quantity * (spec.commission + spec.slippage * spec.multiplier)
+
+
+MODELS = {}
+
+
+def register_model(model):
+    # 自定义模型需要 name、profit_loss(trade, spec) 和 profit_loss_array(prices, signs, quantity, spec)
+    MODELS[model.name] = model
+
+
+register_model(LegacyModel())
+register_model(ContractModel())
+
+
+def get_model(name):
+    try:
+        return MODELS[name]
+    except KeyError:
+        raise ValueError(f"未知的盈亏模型: {name}")
@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+
+# 默认最多缓存的查询结果条数
+DEFAULT_MAX_ENTRIES = 128
+
+
+class QueryCache:
+    # 带LRU淘汰的查询结果缓存；数据版本变化时整体失效
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, loader):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # 在锁外执行查询，避免阻塞其他线程读取缓存
+        value = loader()
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
@@ -0,0 +1,283 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# 查询分析默认关闭；设置环境变量为JSONL日志路径即可开启（'1' 表示使用默认路径）
+PROFILE_ENV = 'FUTURES_REVIEW_PROFILE'
+DEFAULT_LOG_PATH = 'query_profile.jsonl'
+# 耗时直方图按2的幂分桶（微秒）：第k桶为 [2^k, 2^(k+1)) 微秒
+HISTOGRAM_BUCKETS = 24
+# 只对这些语句抓取执行计划；INSERT只在带SELECT时抓取
+_EXPLAIN_KEYWORDS = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _bucket(seconds):
+    micros = seconds * 1e6
+    return 0 if micros < 1 else min(int(math.log2(micros)), HISTOGRAM_BUCKETS - 1)
+
+
+def full_scans(plan):
+    # 执行计划中的全表（或全索引）扫描；子查询、常量行和FTS虚拟表的SCAN不算
+    subqueries = {detail.split()[-1] for detail in plan if detail.startswith(('CO-ROUTINE', 'MATERIALIZE'))}
+    return [
+        detail for detail in plan
+        if detail.startswith('SCAN ') and 'VIRTUAL TABLE' not in detail and 'CONSTANT ROW' not in detail
+        and detail.split()[1] not in subqueries
+    ]
+
+
+class QueryStats:
+    # 同一条SQL（空白归一化后）的累计统计
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+        self.plan = None
+
+    def add(self, seconds, rows):
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        self.histogram[_bucket(seconds)] += 1
+
+    def as_dict(self):
+        scans = full_scans(self.plan) if self.plan else []
+        return {
+            'sql': self.sql,
+            'calls': self.calls,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total * 1000 / self.calls if self.calls else 0.0,
+            'max_ms': self.max * 1000,
+            'rows': self.rows,
+            # {桶上界（毫秒）: 次数}，只列出非空桶
+            'histogram': {2 ** (k + 1) / 1000: count for k, count in enumerate(self.histogram) if count},
+            'plan': self.plan,
+            'full_scan': bool(scans),
+            'scans': scans,
+        }
+
+
+class QueryProfiler:
+    # 记录经过包装连接执行的每条SQL的耗时、返回/影响行数，每条SQL首次执行时抓取 EXPLAIN QUERY PLAN。
+    # log_path不为None时每次执行追加一行JSON；只记录耗时不低于log_threshold_ms的执行，统计不受影响
+    def __init__(self, log_path=None, explain=True, log_threshold_ms=0.0):
+        self.log_path = log_path
+        self.explain = explain
+        self.log_threshold = log_threshold_ms / 1000.0
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._log = open(log_path, 'a', encoding='utf-8') if log_path else None
+
+    def wrap(self, conn):
+        return ProfiledConnection(conn, self)
+
+    def _capture_plan(self, conn, key, sql, params):
+        # 在同一连接上用相同参数执行 EXPLAIN QUERY PLAN，不计入查询耗时
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is not None and stats.plan is not None:
+                return
+        keyword = key.split(' ', 1)[0].upper()
+        if not self.explain or keyword not in _EXPLAIN_KEYWORDS:
+            return
+        if keyword == 'INSERT' and 'SELECT' not in key.upper():
+            return
+        try:
+            plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        except sqlite3.Error:
+            # 无法解释的语句记为空计划，不再重试
+            plan = []
+        with self._lock:
+            stats = self._stats.setdefault(key, QueryStats(key))
+            first = stats.plan is None
+            stats.plan = plan
+        if first:
+            self._write({'event': 'plan', 'sql': key, 'plan': plan, 'scans': full_scans(plan)})
+
+    def record(self, key, seconds, rows):
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats(key)
+            stats.add(seconds, rows)
+        if seconds >= self.log_threshold:
+            self._write({
+                'event': 'query', 'time': time.time(), 'sql': key, 'ms': round(seconds * 1000, 3), 'rows': rows,
+                'thread': threading.current_thread().name,
+            })
+
+    def _write(self, entry):
+        if self._log is None:
+            return
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._log is not None:
+                self._log.write(line)
+                self._log.flush()
+
+    def report(self, sort_by='total_ms'):
+        # 每条SQL一项（见 QueryStats.as_dict），默认按总耗时倒序
+        with self._lock:
+            stats = [s.as_dict() for s in self._stats.values()]
+        return sorted(stats, key=lambda item: item[sort_by], reverse=True)
+
+    def full_scan_queries(self):
+        return [item for item in self.report() if item['full_scan']]
+
+    def format_report(self, limit=20):
+        lines = [f"{'调用':>6}{'总耗时ms':>11}{'平均ms':>9}{'最大ms':>9}{'行数':>9}  SQL"]
+        for item in self.report()[:limit]:
+            flag = ' [全表扫描: ' + '; '.join(item['scans']) + ']' if item['full_scan'] else ''
+            lines.append(
+                f"{item['calls']:>6}{item['total_ms']:>11.2f}{item['mean_ms']:>9.2f}{item['max_ms']:>9.2f}"
+                f"{item['rows']:>9}  {item['sql'][:120]}{flag}"
+            )
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+
+class ProfiledConnection:
+    # sqlite3连接的包装：execute/executemany计时，其余属性原样转发
+    def __init__(self, conn, profiler):
+        self._conn = conn
+        self._profiler = profiler
+
+    def execute(self, sql, params=()):
+        key = normalize_sql(sql)
+        self._profiler._capture_plan(self._conn, key, sql, params)
+        start = time.perf_counter()
+        cursor = self._conn.execute(sql, params)
+        return ProfiledCursor(cursor, self._profiler, key, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_params):
+        key = normalize_sql(sql)
+        start = time.perf_counter()
+        cursor = self._conn.executemany(sql, seq_of_params)
+        self._profiler.record(key, time.perf_counter() - start, max(cursor.rowcount, 0))
+        return cursor
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class ProfiledCursor:
+    # 累计execute和各次fetch在SQLite中的耗时，结果取完、游标关闭或被回收时记录一次。
+    # 查询语句记录返回行数，写语句记录影响行数
+    def __init__(self, cursor, profiler, key, elapsed):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._key = key
+        self._elapsed = elapsed
+        self._rows = 0
+        self._done = False
+        if cursor.description is None:
+            self._finish(max(cursor.rowcount, 0))
+
+    def _finish(self, rows=None):
+        if not self._done:
+            self._done = True
+            self._profiler.record(self._key, self._elapsed, self._rows if rows is None else rows)
+
+    def _timed(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        self._elapsed += time.perf_counter() - start
+        return result
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __del__(self):
+        self._finish()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    # 未开启时返回None，DataModel直接使用原始连接
+    return _profiler
+
+
+def enable(log_path=None, explain=True, log_threshold_ms=0.0):
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None:
+            _profiler.close()
+        _profiler = QueryProfiler(log_path, explain, log_threshold_ms)
+        return _profiler
+
+
+def disable():
+    global _profiler
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+
+def enable_from_env(db_path=None):
+    # FUTURES_REVIEW_PROFILE=1 时日志写到数据库旁（或当前目录）的默认文件，其他值作为日志路径
+    value = os.environ.get(PROFILE_ENV)
+    if not value:
+        return None
+    if value == '1':
+        directory = os.path.dirname(os.path.abspath(db_path)) if db_path else ''
+        value = os.path.join(directory, DEFAULT_LOG_PATH)
+    return enable(value)
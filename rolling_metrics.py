@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+# 滚动窗口：最近N笔交易（按录入顺序）
+ROLLING_WINDOW = 20
+# 状态文件与数据库放在一起：<数据库路径>.rolling.json
+STATE_SUFFIX = '.rolling.json'
+STATE_FORMAT = 1
+# 汇总全部品种的作用域名
+OVERALL = '*'
+ROLLING_COLUMNS = ['id', 'symbol', 'profit_loss']
+
+
+class RollingWindow:
+    # 最近size笔交易的环形缓冲区和累计和，新增一笔为O(1)；
+    # 回撤用单调队列维护窗口内（含窗口起点）的最高权益，当前回撤 = 窗口最高权益 - 当前权益
+    def __init__(self, size, count=0, equity=0.0, values=(), peaks=None):
+        self.size = size
+        self.count = count
+        self.equity = equity
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.wins = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        for value in values:
+            self._add(value)
+        self.peaks = deque(tuple(peak) for peak in peaks) if peaks else deque([(count, equity)])
+
+    def _add(self, value):
+        self.values.append(value)
+        self.total += value
+        if value > 0:
+            self.wins += 1
+            self.gross_profit += value
+        elif value < 0:
+            self.gross_loss -= value
+
+    def _remove(self, value):
+        self.total -= value
+        if value > 0:
+            self.wins -= 1
+            self.gross_profit -= value
+        elif value < 0:
+            self.gross_loss += value
+
+    def push(self, value):
+        if len(self.values) == self.size:
+            self._remove(self.values[0])
+        self._add(value)
+        self.count += 1
+        self.equity += value
+        while self.peaks and self.peaks[-1][1] <= self.equity:
+            self.peaks.pop()
+        self.peaks.append((self.count, self.equity))
+        while self.peaks[0][0] < self.count - self.size:
+            self.peaks.popleft()
+
+    def metrics(self):
+        trades = len(self.values)
+        if self.gross_loss > 0:
+            profit_factor = self.gross_profit / self.gross_loss
+        else:
+            profit_factor = float('inf') if self.gross_profit > 0 else 0.0
+        return {
+            'trades': trades,
+            'win_rate': self.wins / trades if trades else 0.0,
+            'average_profit_loss': self.total / trades if trades else 0.0,
+            'profit_factor': profit_factor,
+            'drawdown': max(self.peaks[0][1] - self.equity, 0.0),
+        }
+
+    def to_state(self):
+        return {'count': self.count, 'equity': self.equity, 'values': list(self.values), 'peaks': list(self.peaks)}
+
+    @classmethod
+    def from_state(cls, size, state):
+        return cls(size, state['count'], state['equity'], state['values'], state['peaks'])
+
+    @classmethod
+    def from_history(cls, size, profit_loss):
+        # 由完整历史直接构造窗口：累计权益用NumPy求和，只逐笔回放最后size笔
+        profit_loss = np.asarray(profit_loss, dtype=np.float64)
+        head = profit_loss[:-size] if len(profit_loss) > size else profit_loss[:0]
+        window = cls(size, count=len(head), equity=float(head.sum()))
+        for value in profit_loss[len(head):]:
+            window.push(float(value))
+        return window
+
+
+class RollingMetrics:
+    # 整体和各品种的滚动指标；sync()只处理上次之后新增的交易，历史被修改或删除时全量重建
+    def __init__(self, data_model, window=ROLLING_WINDOW, state_path=None):
+        self.data_model = data_model
+        self.window = window
+        self.state_path = state_path or data_model.db_path + STATE_SUFFIX
+        self.windows = None
+        self.last_id = 0
+        self.history_revision = None
+        self._lock = threading.Lock()
+
+    def sync(self):
+        # 返回 {作用域: 指标}，作用域为品种或 OVERALL
+        with self._lock:
+            revision = self.data_model.get_history_revision()
+            if self.windows is None:
+                self._load()
+            if self.windows is None or self.history_revision != revision:
+                self._rebuild(revision)
+                self._save()
+            else:
+                last_id = self.last_id
+                for trade_id, symbol, profit_loss in self.data_model.iter_trades(
+                        columns=ROLLING_COLUMNS, after_id=self.last_id):
+                    self._push(symbol, profit_loss)
+                    self.last_id = trade_id
+                if self.last_id != last_id:
+                    self._save()
+            return self.metrics()
+
+    def metrics(self):
+        return {scope: window.metrics() for scope, window in self.windows.items()}
+
+    def _push(self, symbol, profit_loss):
+        value = 0.0 if profit_loss is None else profit_loss
+        self.windows[OVERALL].push(value)
+        if symbol not in self.windows:
+            self.windows[symbol] = RollingWindow(self.window)
+        self.windows[symbol].push(value)
+
+    def _rebuild(self, revision):
+        ids, symbols, profit_loss = [], [], []
+        for trade_id, symbol, pl in self.data_model.iter_trades(batch_size=50000, columns=ROLLING_COLUMNS):
+            ids.append(trade_id)
+            symbols.append(symbol)
+            profit_loss.append(0.0 if pl is None else pl)
+        profit_loss = np.asarray(profit_loss, dtype=np.float64)
+        names, codes = np.unique(np.asarray(symbols, dtype=object), return_inverse=True) if symbols else ([], [])
+        windows = {OVERALL: RollingWindow.from_history(self.window, profit_loss)}
+        if len(names):
+            # 按品种稳定排序后，每个品种的交易是连续且保持录入顺序的一段
+            order = np.argsort(codes, kind='stable')
+            offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(names)))))
+            grouped = profit_loss[order]
+            for code, symbol in enumerate(names):
+                windows[symbol] = RollingWindow.from_history(self.window, grouped[offsets[code]:offsets[code + 1]])
+        self.windows = windows
+        self.last_id = ids[-1] if ids else 0
+        self.history_revision = revision
+
+    def _load(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('format') != STATE_FORMAT or state.get('window') != self.window:
+            return
+        self.windows = {scope: RollingWindow.from_state(self.window, data) for scope, data in state['windows'].items()}
+        self.last_id = state['last_id']
+        self.history_revision = state['history_revision']
+
+    def _save(self):
+        state = {
+            'format': STATE_FORMAT,
+            'window': self.window,
+            'last_id': self.last_id,
+            'history_revision': self.history_revision,
+            'windows': {scope: window.to_state() for scope, window in self.windows.items()},
+        }
+        try:
+            with open(self.state_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(self.state_path + '.tmp', self.state_path)
+        except OSError:
+            # 状态只是缓存，写失败下次全量重建
+            pass
@@ -0,0 +1,186 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# 列式快照：每个数值列一个.npy文件，文本列字典编码为int32代码；
+# 用 np.load(mmap_mode='r') 打开，多个分析进程共享同一份页缓存
+SNAPSHOT_DIR = 'trade_snapshot'
+SNAPSHOT_FORMAT = 2
+META_FILE = 'meta.json'
+DICTIONARY_FILE = 'dictionaries.json'
+
+NUMERIC_COLUMNS = {
+    'id': '<i8',
+    'open_cycle': '<i8',
+    'close_cycle': '<i8',
+    'open_price': '<f8',
+    'drawdown': '<f8',
+    'add_price': '<f8',
+    'add_price1': '<f8',
+    'reduce_price': '<f8',
+    'reduce_price1': '<f8',
+    'close_price': '<f8',
+    'profit_loss': '<f8',
+    'open_ts': '<i8',
+    'close_ts': '<i8',
+    'holding_seconds': '<i8',
+    'quantity': '<f8',
+}
+TEXT_COLUMNS = [
+    'symbol', 'direction', 'open_boundary_ma', 'target_boundary_ma', 'drive_strategy', 'entry_mode',
+    'entry_signal', 'stop_loss_rule', 'take_profit_rule', 'open_emotion', 'close_boundary_ma',
+    'exit_signal', 'close_emotion',
+]
+CODE_DTYPE = '<i4'
+# 整数列的空值
+MISSING_INT = -1
+REFRESH_BATCH_SIZE = 50000
+
+# 自己写固定长度的.npy头（总长128字节），追加行时只需原地改写shape
+_MAGIC = b'\x93NUMPY\x01\x00'
+_HEADER_SIZE = 128
+
+
+def _write_header(f, descr, rows):
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (descr, rows)
+    header = header.ljust(_HEADER_SIZE - len(_MAGIC) - 2 - 1) + '\n'
+    f.seek(0)
+    f.write(_MAGIC + struct.pack('<H', len(header)) + header.encode('latin1'))
+
+
+def _column_path(directory, column):
+    return os.path.join(directory, f'{column}.npy')
+
+
+def _column_dtypes():
+    dtypes = dict(NUMERIC_COLUMNS)
+    dtypes.update({column: CODE_DTYPE for column in TEXT_COLUMNS})
+    return dtypes
+
+
+class TradeSnapshot:
+    def __init__(self, directory, meta, dictionaries):
+        self.directory = directory
+        self.meta = meta
+        self.dictionaries = dictionaries
+        self._arrays = {}
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def column(self, name):
+        # 数值列或文本列的代码数组（只读内存映射）
+        if name not in self._arrays:
+            dtype = _column_dtypes()[name]
+            if self.meta['rows'] == 0:
+                self._arrays[name] = np.zeros(0, dtype=dtype)
+            else:
+                self._arrays[name] = np.load(_column_path(self.directory, name), mmap_mode='r')
+        return self._arrays[name]
+
+    def decode(self, name):
+        # 把字典编码的文本列还原为字符串数组
+        return np.asarray(self.dictionaries[name], dtype=object)[self.column(name)]
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(os.path.join(directory, DICTIONARY_FILE), encoding='utf-8') as f:
+            dictionaries = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if meta.get('format') != SNAPSHOT_FORMAT:
+        return None, None
+    return meta, dictionaries
+
+
+def _files_consistent(directory, rows):
+    # 上次刷新中途被中断时，文件长度会与meta记录的行数不一致
+    for column, dtype in _column_dtypes().items():
+        path = _column_path(directory, column)
+        if not os.path.exists(path):
+            return False
+        if os.path.getsize(path) != _HEADER_SIZE + rows * np.dtype(dtype).itemsize:
+            return False
+    return True
+
+
+def _write_json(directory, name, data):
+    path = os.path.join(directory, name)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def open_snapshot(directory=SNAPSHOT_DIR):
+    meta, dictionaries = _read_meta(directory)
+    if meta is None or not _files_consistent(directory, meta['rows']):
+        raise FileNotFoundError(f"快照不存在或不完整: {directory}")
+    return TradeSnapshot(directory, meta, dictionaries)
+
+
+def refresh_snapshot(data_model, directory=SNAPSHOT_DIR, batch_size=REFRESH_BATCH_SIZE):
+    # 只追加新插入的行；历史被修改或删除（修订号变化）时全量重建
+    os.makedirs(directory, exist_ok=True)
+    revision = data_model.get_history_revision()
+    meta, dictionaries = _read_meta(directory)
+    if (meta is None or meta.get('history_revision') != revision
+            or not _files_consistent(directory, meta['rows'])):
+        meta = {'format': SNAPSHOT_FORMAT, 'rows': 0, 'last_id': 0, 'history_revision': revision}
+        dictionaries = {column: [] for column in TEXT_COLUMNS}
+        for column, dtype in _column_dtypes().items():
+            with open(_column_path(directory, column), 'wb') as f:
+                _write_header(f, dtype, 0)
+
+    lookups = {column: {value: code for code, value in enumerate(dictionaries[column])} for column in TEXT_COLUMNS}
+    columns = list(NUMERIC_COLUMNS) + TEXT_COLUMNS
+    rows = meta['rows']
+    last_id = meta['last_id']
+    batch = []
+    for row in data_model.iter_trades(batch_size=batch_size, columns=columns, after_id=last_id):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            rows = _append_batch(directory, batch, columns, lookups, dictionaries, rows)
+            last_id = batch[-1][0]
+            batch = []
+    if batch:
+        rows = _append_batch(directory, batch, columns, lookups, dictionaries, rows)
+        last_id = batch[-1][0]
+
+    meta.update({'rows': rows, 'last_id': last_id})
+    # 先写字典再写meta，meta是刷新完成的标志
+    _write_json(directory, DICTIONARY_FILE, dictionaries)
+    _write_json(directory, META_FILE, meta)
+    return TradeSnapshot(directory, meta, dictionaries)
+
+
+def _append_batch(directory, batch, columns, lookups, dictionaries, rows):
+    new_rows = rows + len(batch)
+    for index, column in enumerate(columns):
+        values = [row[index] for row in batch]
+        if column in NUMERIC_COLUMNS:
+            dtype = NUMERIC_COLUMNS[column]
+            if dtype == '<f8':
+                array = np.array([np.nan if v is None else v for v in values], dtype=dtype)
+            else:
+                array = np.array([MISSING_INT if v is None else v for v in values], dtype=dtype)
+        else:
+            dtype = CODE_DTYPE
+            lookup = lookups[column]
+            codes = []
+            for value in values:
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(dictionaries[column])
+                    dictionaries[column].append(value)
+                codes.append(code)
+            array = np.array(codes, dtype=dtype)
+        with open(_column_path(directory, column), 'r+b') as f:
+            f.seek(_HEADER_SIZE + rows * np.dtype(dtype).itemsize)
+            f.write(array.tobytes())
+            _write_header(f, dtype, new_rows)
+    return new_rows
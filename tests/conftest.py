@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# 测试直接导入仓库根目录下的模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_connection
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'futures_review.db')
+    yield path
+    db_connection.close_all()
@@ -0,0 +1,35 @@
+import sqlite3
+
+from benchmarks.synthetic import generate_trades
+from data_model import DataModel
+from pnl import ContractSpec, get_model
+
+
+def _expected(trade, spec):
+    return get_model(spec.model).profit_loss(trade, spec)
+
+
+def test_spec_change_from_other_instance(db_path):
+    trade, = generate_trades(1)
+    first = DataModel(db_path)
+    legacy = first.profit_loss(trade)
+    spec = ContractSpec(trade['symbol'], 'contract', multiplier=10.0, commission=2.0)
+    DataModel(db_path).set_contract_spec(spec)
+    assert first.profit_loss(trade) == _expected(trade, spec) != legacy
+
+
+def test_spec_change_from_other_connection(db_path):
+    trade, = generate_trades(1)
+    model = DataModel(db_path)
+    model.profit_loss(trade)
+    spec = ContractSpec(trade['symbol'], 'contract', multiplier=5.0)
+    # 另一个进程直接写入规格表
+    conn = sqlite3.connect(db_path)
+    conn.execute('INSERT INTO contract_specs (symbol, model, multiplier, commission, slippage) VALUES (?, ?, ?, ?, ?)',
+                 spec.as_row())
+    conn.commit()
+    conn.close()
+    assert model.profit_loss(trade) == _expected(trade, spec)
+    assert model.insert_trades([trade]) == 1
+    # 列表列的最后一项是盈亏
+    assert model.get_trades_page()[0][-1] == _expected(trade, spec)
@@ -0,0 +1,100 @@
+import sqlite3
+
+import pytest
+
+import data_model
+import db_connection
+import migrations
+from benchmarks.synthetic import generate_trades
+from data_model import DataModel
+
+TRADE_COUNT = 50
+
+
+class Killed(BaseException):
+    # 模拟进程在某条语句执行时被杀掉
+    pass
+
+
+class KillingConnection:
+    # 执行到包含marker的语句时抛出Killed，其余调用转发给原连接
+    def __init__(self, conn, marker):
+        self._conn = conn
+        self._marker = marker
+
+    def execute(self, sql, params=()):
+        if self._marker in sql:
+            raise Killed(sql)
+        return self._conn.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _create_legacy_db(path):
+    trades = list(generate_trades(TRADE_COUNT))
+    columns = data_model.TRADE_FIELDS + ['profit_loss']
+    conn = sqlite3.connect(path)
+    conn.execute(migrations._LEGACY_TRADES_TABLE_SQL)
+    conn.executemany(
+        f"INSERT INTO trades ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [[trade[field] for field in data_model.TRADE_FIELDS] + [data_model.calculate_profit_loss(trade)]
+         for trade in trades]
+    )
+    conn.commit()
+    conn.close()
+    return trades
+
+
+def _kill_at(monkeypatch, version, step, marker):
+    migration = migrations.MIGRATIONS[version - 1]
+    original = getattr(migration, step)
+    monkeypatch.setattr(migration, step, lambda conn: original(KillingConnection(conn, marker)))
+
+
+def _reopen(path):
+    # 模拟进程重启：丢弃所有连接，重新打开时继续迁移
+    db_connection.close_all()
+    return DataModel(path)
+
+
+def _assert_consistent(model, trades):
+    assert len(model.get_all_trades()) == len(trades)
+    assert migrations.current_version(model._db) == migrations.LATEST_VERSION
+    assert model.verify_symbol_summary() == []
+    assert sum(row[1] for row in model.get_pl_rollup('day')) == len(trades)
+
+
+@pytest.mark.parametrize('version, step, marker', [
+    (3, 'finish', 'ALTER TABLE trades_encoded RENAME'),
+    (5, 'apply', 'INSERT INTO symbol_summary'),
+    (6, 'apply', 'INSERT INTO pl_rollup'),
+])
+def test_killed_migration_is_rolled_back(monkeypatch, db_path, version, step, marker):
+    trades = _create_legacy_db(db_path)
+    with monkeypatch.context() as patch:
+        _kill_at(patch, version, step, marker)
+        with pytest.raises(Killed):
+            DataModel(db_path)
+    model = _reopen(db_path)
+    _assert_consistent(model, trades)
+
+
+def test_killed_search_index_is_rebuilt(monkeypatch, db_path):
+    trades = _create_legacy_db(db_path)
+    with monkeypatch.context() as patch:
+        _kill_at(patch, 9, 'apply', "VALUES ('rebuild')")
+        with pytest.raises(Killed):
+            DataModel(db_path)
+    model = _reopen(db_path)
+    _assert_consistent(model, trades)
+    if not model._has_search_index():
+        pytest.skip('SQLite不支持FTS5 trigram')
+    # trigram分词只能匹配不短于三个字符的检索词
+    value = next(trade['drive_strategy'] for trade in trades
+                 if len(trade['drive_strategy']) >= data_model.SEARCH_MIN_TERM_LENGTH)
+    expected = sum(1 for trade in trades if value in trade['drive_strategy'])
+    found = model._fetchall(
+        'SELECT COUNT(*) FROM trade_search WHERE drive_strategy MATCH ?', ('"' + value + '"',)
+    )[0][0]
+    assert found == expected
@@ -0,0 +1,138 @@
+import itertools
+import json
+import os
+
+import pytest
+
+from benchmarks.synthetic import generate_trades
+from data_model import DataModel
+from trade_writer import COMMITTED_SEQ_KEY, TradeWriter
+
+
+def _fail_once(data_model):
+    # 第一次写库抛出异常，之后恢复正常
+    original = data_model.insert_trades_with_meta
+    calls = itertools.count()
+
+    def insert_trades_with_meta(trades, meta):
+        if next(calls) == 0:
+            raise RuntimeError('写库失败')
+        return original(trades, meta)
+
+    data_model.insert_trades_with_meta = insert_trades_with_meta
+
+
+def _count(data_model):
+    return len(data_model.get_all_trades())
+
+
+def test_failed_batch_is_retried_with_next_batch(db_path):
+    first, second = generate_trades(2)
+    data_model = DataModel(db_path)
+    _fail_once(data_model)
+    errors = []
+    writer = TradeWriter(data_model, on_error=errors.append)
+    writer.submit(first).result()
+    writer.flush()
+    assert len(errors) == 1
+    assert _count(data_model) == 0
+    writer.submit(second).result()
+    writer.flush()
+    writer.close()
+    assert _count(data_model) == 2
+    assert data_model.get_meta(COMMITTED_SEQ_KEY) == 2
+    # 重新打开时没有需要重放的交易，也不会重复写入
+    TradeWriter(DataModel(db_path)).close()
+    assert _count(data_model) == 2
+
+
+def test_failed_batch_is_replayed_after_restart(db_path):
+    first, = generate_trades(1)
+    data_model = DataModel(db_path)
+    _fail_once(data_model)
+    writer = TradeWriter(data_model, on_error=lambda error: None)
+    writer.submit(first).result()
+    writer.flush()
+    # 退出前的最后一次重试成功
+    writer.close()
+    assert _count(data_model) == 1
+
+
+def test_failed_replay_is_not_skipped_by_later_batch(db_path):
+    first, second = generate_trades(2)
+    data_model = DataModel(db_path)
+    _fail_once(data_model)
+    writer = TradeWriter(data_model, on_error=lambda error: None)
+    writer.submit(first).result()
+    writer.flush()
+    # 模拟进程在写库失败后崩溃：日志仍保留第1笔
+    writer._pending = []
+    writer.close()
+    assert _count(data_model) == 0
+
+    data_model = DataModel(db_path)
+    _fail_once(data_model)
+    writer = TradeWriter(data_model, on_error=lambda error: None)
+    writer.submit(second).result()
+    writer.flush()
+    writer.close()
+    assert _count(data_model) == 2
+    assert data_model.get_meta(COMMITTED_SEQ_KEY) == 2
+
+
+def _always_fail(data_model):
+    def insert_trades_with_meta(trades, meta):
+        raise RuntimeError('写库失败')
+
+    data_model.insert_trades_with_meta = insert_trades_with_meta
+
+
+def _kill(writer):
+    # 模拟进程被杀掉：待提交的交易只剩日志中的记录
+    writer._pending = []
+    writer.close()
+
+
+def test_torn_journal_tail_with_failed_replay(db_path):
+    first, second = generate_trades(2)
+    with open(db_path + '.journal', 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'seq': 1, 'trade': first}, ensure_ascii=False) + '\n')
+        f.write('{"seq": 2, "trade": {"sym')
+    data_model = DataModel(db_path)
+    _always_fail(data_model)
+    writer = TradeWriter(data_model, on_error=lambda error: None)
+    writer.submit(second).result()
+    writer.flush()
+    _kill(writer)
+
+    data_model = DataModel(db_path)
+    TradeWriter(data_model).close()
+    assert [row[1] for row in data_model.get_trades_page()] == [first['symbol'], second['symbol']]
+
+
+def test_failed_journal_write_is_not_replayed(monkeypatch, db_path):
+    first, second = generate_trades(2)
+    data_model = DataModel(db_path)
+    _always_fail(data_model)
+    writer = TradeWriter(data_model, on_error=lambda error: None)
+    fsync = os.fsync
+    calls = itertools.count()
+
+    def fail_first_fsync(fd):
+        if next(calls) == 0:
+            raise OSError('磁盘已满')
+        fsync(fd)
+
+    monkeypatch.setattr(os, 'fsync', fail_first_fsync)
+    with pytest.raises(OSError):
+        writer.submit(first).result()
+    writer.submit(second).result()
+    writer.flush()
+    _kill(writer)
+    monkeypatch.setattr(os, 'fsync', fsync)
+
+    data_model = DataModel(db_path)
+    TradeWriter(data_model).close()
+    rows = data_model.get_trades_page()
+    assert len(rows) == 1
+    assert data_model.get_all_trades()[0][1:3] == (second['symbol'], second['direction'])
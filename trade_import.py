@@ -0,0 +1,125 @@
+import argparse
+import csv
+import time
+
+from data_model import (DataModel, DEFAULT_DB_PATH, TRADE_FIELDS, INTEGER_FIELDS, FLOAT_FIELDS, BULK_CHUNK_SIZE,
+                        DEFAULT_QUANTITY)
+
+# CSV表头既可以使用字段名，也可以使用录入界面上的中文名称
+HEADER_ALIASES = {
+    '品种': 'symbol',
+    '交易方向': 'direction',
+    '开仓时间': 'open_time',
+    '开仓操作周期': 'open_cycle',
+    '开仓起始边界均线': 'open_boundary_ma',
+    '预期目标边界均线': 'target_boundary_ma',
+    '驱动策略': 'drive_strategy',
+    '入场模式': 'entry_mode',
+    '入场信号': 'entry_signal',
+    '止损规则': 'stop_loss_rule',
+    '止盈规则': 'take_profit_rule',
+    '开仓情绪': 'open_emotion',
+    '开仓价格': 'open_price',
+    '回撤幅度': 'drawdown',
+    '增仓价格': 'add_price',
+    '增仓价格1': 'add_price1',
+    '减仓价格': 'reduce_price',
+    '减仓价格1': 'reduce_price1',
+    '平仓操作周期': 'close_cycle',
+    '平仓时间': 'close_time',
+    '平仓边界均线': 'close_boundary_ma',
+    '离场信号': 'exit_signal',
+    '平仓情绪': 'close_emotion',
+    '平仓价格': 'close_price',
+    '手数': 'quantity',
+}
+
+REQUIRED_TEXT_FIELDS = ['symbol', 'direction', 'open_time', 'close_time']
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.rejected = []  # (行号, 原因)
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (f"导入 {self.imported} 行，拒绝 {len(self.rejected)} 行，"
+                f"耗时 {self.elapsed:.2f} 秒（{self.rows_per_second:.0f} 行/秒）")
+
+
+def _normalize_header(name):
+    name = (name or '').strip()
+    return HEADER_ALIASES.get(name, name)
+
+
+def parse_row(row):
+    # 校验并转换一行CSV数据，失败时抛出ValueError
+    trade_data = {}
+    for field in TRADE_FIELDS:
+        value = (row.get(field) or '').strip()
+        if field in INTEGER_FIELDS:
+            trade_data[field] = int(value) if value else 0
+        elif field in FLOAT_FIELDS:
+            trade_data[field] = float(value) if value else 0.0
+        else:
+            trade_data[field] = value
+    for field in REQUIRED_TEXT_FIELDS:
+        if not trade_data[field]:
+            raise ValueError(f"缺少字段 {field}")
+    # 手数列可省略
+    quantity = (row.get('quantity') or '').strip()
+    trade_data['quantity'] = float(quantity) if quantity else DEFAULT_QUANTITY
+    if trade_data['quantity'] <= 0:
+        raise ValueError("手数必须大于0")
+    return trade_data
+
+
+def iter_csv_trades(path, report, encoding='utf-8-sig'):
+    # 逐行流式读取，不把整个文件载入内存
+    with open(path, newline='', encoding=encoding) as f:
+        reader = csv.reader(f)
+        header = [_normalize_header(name) for name in next(reader, [])]
+        missing = [field for field in REQUIRED_TEXT_FIELDS if field not in header]
+        if missing:
+            raise ValueError(f"CSV缺少列: {', '.join(missing)}")
+        for line_no, values in enumerate(reader, start=2):
+            if not any(values):
+                continue
+            try:
+                yield parse_row(dict(zip(header, values)))
+            except ValueError as e:
+                report.rejected.append((line_no, str(e)))
+
+
+def import_csv(path, data_model=None, chunk_size=BULK_CHUNK_SIZE, encoding='utf-8-sig'):
+    data_model = data_model or DataModel()
+    report = ImportReport()
+    start = time.perf_counter()
+    report.imported = data_model.insert_trades(iter_csv_trades(path, report, encoding), chunk_size=chunk_size)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量导入交易记录CSV')
+    parser.add_argument('csv_path')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    parser.add_argument('--chunk-size', type=int, default=BULK_CHUNK_SIZE)
+    parser.add_argument('--encoding', default='utf-8-sig')
+    args = parser.parse_args(argv)
+
+    report = import_csv(args.csv_path, DataModel(args.db), args.chunk_size, args.encoding)
+    print(report)
+    for line_no, reason in report.rejected[:20]:
+        print(f"  第{line_no}行: {reason}")
+    if len(report.rejected) > 20:
+        print(f"  ……其余 {len(report.rejected) - 20} 行省略")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import calendar
+import datetime
+import re
+
+# 匹配 XXXX年XX月XX日XX时XX分，也兼容 2024-01-02 09:30 / 2024/1/2 9:30 等写法
+_TIME_PATTERN = re.compile(r'(\d{4})\D+(\d{1,2})\D+(\d{1,2})(?:\D+(\d{1,2})\D+(\d{1,2}))?')
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def parse_trade_time(text):
+    # 把录入的时间文本解析为时间戳（按挂钟时间存储，不做时区换算），无法解析时返回None
+    if not text:
+        return None
+    match = _TIME_PATTERN.search(text)
+    if not match:
+        return None
+    year, month, day, hour, minute = (int(g) if g else 0 for g in match.groups())
+    try:
+        return calendar.timegm(datetime.datetime(year, month, day, hour, minute).timetuple())
+    except ValueError:
+        return None
+
+
+def to_epoch(value):
+    # 查询参数可以是时间戳、date/datetime或时间文本
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime.datetime):
+        return calendar.timegm(value.timetuple())
+    if isinstance(value, datetime.date):
+        return calendar.timegm(value.timetuple())
+    ts = parse_trade_time(str(value))
+    if ts is None:
+        raise ValueError(f"无法解析时间: {value}")
+    return ts
+
+
+def format_epoch(ts):
+    if ts is None:
+        return ''
+    return (_EPOCH + datetime.timedelta(seconds=ts)).strftime('%Y-%m-%d %H:%M')
+
+
+def period_bucket(period, ts):
+    # 时间戳所在的日/周/月桶，格式与数据库中的周期分组表达式一致（周为ISO周）
+    moment = _EPOCH + datetime.timedelta(seconds=ts)
+    if period == 'day':
+        return moment.strftime('%Y-%m-%d')
+    if period == 'week':
+        year, week, _ = moment.isocalendar()
+        return f'{year}-W{week:02d}'
+    if period == 'month':
+        return moment.strftime('%Y-%m')
+    raise ValueError(f"未知的周期: {period}")
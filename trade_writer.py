@@ -0,0 +1,190 @@
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+# 日志文件与数据库放在一起：<数据库路径>.journal
+JOURNAL_SUFFIX = '.journal'
+# trade_meta中已提交到数据库的最大日志序号
+COMMITTED_SEQ_KEY = 'writer_committed_seq'
+# 每次组提交最多合并的交易数，以及等待更多交易的最长时间（秒）
+MAX_BATCH = 500
+MAX_DELAY = 0.05
+
+_STOP = object()
+
+
+class TradeWriter:
+    # 后台写入队列：submit()在后台线程把交易追加到日志并fsync后即确认（future返回盈亏），
+    # 随后成批写入数据库；日志序号与交易在同一事务中提交，启动时重放尚未提交的日志。
+    # 已提交序号是连续的水位：它之前的交易都已写入数据库，写库失败的交易留在待提交列表中，随下一批一起重试
+    def __init__(self, data_model, journal_path=None, on_error=None):
+        self.data_model = data_model
+        self.journal_path = journal_path or data_model.db_path + JOURNAL_SUFFIX
+        self.on_error = on_error
+        self._queue = queue.Queue()
+        # 已写入日志但尚未写入数据库的 (序号, 交易)，按序号排列
+        self._pending = []
+        self._seq = self._replay()
+        # 无缓冲的二进制追加：写入失败时缓冲区里不会残留半批数据，可以截断回批次开始处
+        self._journal = open(self.journal_path, 'ab', buffering=0)
+        self._thread = threading.Thread(target=self._run, name='trade-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, trade_data):
+        # 盈亏在调用线程中计算，数据有误时立即抛出；返回的future在交易写入日志后给出盈亏
+        future = Future()
+        pl = self.data_model.profit_loss(trade_data)
+        self._queue.put((dict(trade_data), pl, future))
+        return future
+
+    def flush(self):
+        # 阻塞到已提交的交易全部写入数据库
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._journal.close()
+
+    def _replay(self):
+        committed = self.data_model.get_meta(COMMITTED_SEQ_KEY)
+        entries = []
+        last_seq = committed
+        try:
+            with open(self.journal_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        # 只有以换行结尾的行是完整写入的；最后没有换行的部分是写到一半崩溃留下的，从未被确认
+        complete = data.rfind(b'\n') + 1
+        for line in data[:complete].decode('utf-8').splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            last_seq = max(last_seq, entry['seq'])
+            if entry['seq'] > committed:
+                entries.append(entry)
+        self._pending = [(entry['seq'], entry['trade']) for entry in entries]
+        if self._pending and not self._commit_pending():
+            # 保留日志，写入线程处理下一批时重试；先去掉残缺的尾部，之后追加的行不会接在它后面
+            if complete < len(data):
+                self._truncate_journal(complete)
+            return last_seq
+        if data:
+            self._truncate_journal()
+        return last_seq
+
+    def _truncate_journal(self, size=0):
+        with open(self.journal_path, 'r+b') as f:
+            f.truncate(size)
+            os.fsync(f.fileno())
+
+    def _take_batch(self):
+        # 阻塞等待第一笔，再在MAX_DELAY内尽量凑满一批
+        batch = [self._queue.get()]
+        while len(batch) < MAX_BATCH and batch[-1] is not _STOP:
+            try:
+                batch.append(self._queue.get(timeout=MAX_DELAY))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            stopping = batch[-1] is _STOP
+            entries = [item for item in batch if item is not _STOP]
+            try:
+                if entries:
+                    self._write_batch(entries)
+                elif stopping and self._pending:
+                    # 退出前最后重试一次，失败的交易仍在日志中，下次启动重放
+                    self._commit_pending()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stopping:
+                return
+
+    def _write_batch(self, entries):
+        lines = []
+        for seq, (trade_data, pl, future) in enumerate(entries, self._seq + 1):
+            lines.append(json.dumps({'seq': seq, 'trade': trade_data}, ensure_ascii=False) + '\n')
+        data = ''.join(lines).encode('utf-8')
+        start = None
+        try:
+            start = self._journal.seek(0, os.SEEK_END)
+            written = 0
+            while written < len(data):
+                written += self._journal.write(data[written:])
+            os.fsync(self._journal.fileno())
+        except OSError as e:
+            # 日志写不进去就不能确认，交给调用方处理；已写入的部分截掉，重放时不会写入这些被告知失败的交易
+            try:
+                if start is not None:
+                    self._journal.truncate(start)
+            except OSError:
+                # 截断也失败时跳过这些序号，至少不与之后的交易重复
+                self._seq += len(entries)
+            for trade_data, pl, future in entries:
+                future.set_exception(e)
+            return
+        # 日志落盘即确认，之后即使进程崩溃也会在下次启动时重放
+        for trade_data, pl, future in entries:
+            self._seq += 1
+            self._pending.append((self._seq, trade_data))
+            future.set_result(pl)
+        if self._commit_pending() and self._queue.empty():
+            # 日志中的交易已全部提交，清空日志避免无限增长
+            self._journal.truncate(0)
+            self._journal.seek(0)
+
+    def _commit_pending(self):
+        # 待提交的交易（包括之前失败的）在一个事务中写入，已提交序号推进到最后一笔；
+        # 失败时全部保留，已提交序号不变，重放不会跳过任何一笔
+        try:
+            self.data_model.insert_trades_with_meta(
+                [trade_data for seq, trade_data in self._pending], {COMMITTED_SEQ_KEY: self._pending[-1][0]}
+            )
+        except Exception as e:
+            self._report(f"第{self._pending[0][0]}-{self._pending[-1][0]}笔写入数据库失败", e)
+            return False
+        self._pending = []
+        return True
+
+    def _report(self, message, error):
+        if self.on_error is not None:
+            self.on_error(error)
+        else:
+            print(f"TradeWriter: {message}: {error!r}")
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_trade_writer(data_model):
+    # 同一数据库共享一个写入线程
+    with _writers_lock:
+        writer = _writers.get(data_model.db_path)
+        if writer is None:
+            writer = _writers[data_model.db_path] = TradeWriter(data_model)
+        return writer
+
+
+def flush_all_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.flush()
+
+
+def close_all_writers():
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()